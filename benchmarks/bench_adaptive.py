@@ -0,0 +1,85 @@
+"""Questions needed to master a table range, uniform versus adaptive practice.
+
+A simulated learner starts out knowing each fact with a random probability
+and gets better at a fact every time it is asked. The benchmark counts the
+questions until every fact is known with at least `--mastery` probability.
+
+Run from the project root:
+    python -m benchmarks.bench_adaptive
+"""
+import argparse
+import random
+import sys
+import time
+
+from multipy.models import Settings
+from multipy.services.adaptive import AdaptiveScheduler
+from multipy.services.math_generator import MathGenerator
+
+class SimulatedLearner:
+    def __init__(self, table_range: int, seed: int, learn_rate: float):
+        rng = random.Random(seed)
+        self.rng = rng
+        self.learn_rate = learn_rate
+        self.known = {
+            (a, b): rng.uniform(0.3, 0.95)
+            for a in range(1, table_range + 1)
+            for b in range(1, table_range + 1)
+        }
+
+    def answer(self, a: int, b: int):
+        p = self.known[(a, b)]
+        correct = self.rng.random() < p
+        # Weak facts are recalled slowly
+        response_ns = int((1.0 + 4.0 * (1 - p)) * 1e9)
+        self.known[(a, b)] = p + self.learn_rate * (1 - p)
+        return correct, response_ns
+
+    def mastered(self, mastery: float) -> bool:
+        return min(self.known.values()) >= mastery
+
+def questions_to_mastery(table_range: int, adaptive: bool, seed: int, args) -> int:
+    learner = SimulatedLearner(table_range, seed, args.learn_rate)
+    scheduler = AdaptiveScheduler(Settings(table_range=table_range), seed=seed) if adaptive else None
+    random.seed(seed)
+    for question in range(1, args.max_questions + 1):
+        if scheduler is not None:
+            problem = scheduler.next_problem()
+        else:
+            problem = MathGenerator.generate_problem(table_range)
+        correct, response_ns = learner.answer(problem.factor_a, problem.factor_b)
+        if scheduler is not None:
+            scheduler.observe(problem.factor_a, problem.factor_b, correct, response_ns)
+        if learner.mastered(args.mastery):
+            return question
+    return args.max_questions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--table-range", type=int, default=10)
+    parser.add_argument("--learners", type=int, default=5)
+    parser.add_argument("--mastery", type=float, default=0.9)
+    parser.add_argument("--learn-rate", type=float, default=0.3)
+    parser.add_argument("--max-questions", type=int, default=100000)
+    args = parser.parse_args()
+
+    totals = {}
+    for adaptive in (False, True):
+        counts = [questions_to_mastery(args.table_range, adaptive, seed, args) for seed in range(args.learners)]
+        totals[adaptive] = sum(counts) / len(counts)
+        print(f"{'adaptive' if adaptive else 'uniform':>8}: {totals[adaptive]:>8.0f} questions on average")
+
+    # Per-question cost of the scheduler at the largest range
+    scheduler = AdaptiveScheduler(Settings(table_range=50), seed=0)
+    start = time.perf_counter_ns()
+    for _ in range(10000):
+        problem = scheduler.next_problem()
+        scheduler.observe(problem.factor_a, problem.factor_b, True, 2 * 10**9)
+    per_question_us = (time.perf_counter_ns() - start) / 10000 / 1000
+    print(f"scheduler cost at range 50: {per_question_us:.1f} us per question")
+
+    print(f"adaptive needs {totals[True] / totals[False]:.0%} of the uniform questions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
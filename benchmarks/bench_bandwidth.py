@@ -0,0 +1,109 @@
+"""Terminal bytes per session, with and without low-bandwidth mode.
+
+Starts a `SessionHost` on localhost, connects clients that each play a
+timed Normal mode session by typing answers at a steady pace, and reports
+the bytes every client received during its session. Textual fixes its
+frame rate when it is imported, so the low-bandwidth run is a fresh process
+started with TEXTUAL_FPS set.
+
+Run from the project root:
+    python -m benchmarks.bench_bandwidth --clients 5 --questions 20
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from multipy.hosting import SessionHost
+from multipy.models import GameMode, Settings
+from multipy.services.bandwidth import LOW_BANDWIDTH_FPS
+from benchmarks.bench_hosting import LocalClient, say
+
+async def play(app, client: LocalClient, settings: Settings, pace: float) -> int:
+    """Play one session through the client's keys, returns the bytes it received."""
+    app.call_later(app.start_practice, settings)
+    while type(app.screen).__name__ != "PracticeView":
+        await asyncio.sleep(0.01)
+    received = client.received
+    view = app.screen
+    while app.screen is view:
+        await asyncio.sleep(pace)
+        if app.screen is view and view.current_problem is not None:
+            await client.send_keys(f"{view.current_problem.answer}\r")
+    # Let the summary reach the client
+    await asyncio.sleep(0.5)
+    return client.received - received
+
+def app_of(host: SessionHost, client: LocalClient):
+    """The session serving `client`, `host.sessions` is a set in no particular order."""
+    address = client.writer.get_extra_info("sockname")
+    return next(app for app in host.sessions if app.client.writer.get_extra_info("peername") == address)
+
+async def run(low_bandwidth: bool, args) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        host = SessionHost(
+            max_sessions=args.clients, history_dir=None,
+            event_log_dir=Path(tmp) / "events", low_bandwidth=low_bandwidth, log=None,
+        )
+        port = await host.start(port=0)
+        clients = [LocalClient() for _ in range(args.clients)]
+        for client in clients:
+            await client.connect(port)
+        while len(host.sessions) < args.clients or any(app.focused is None for app in host.sessions):
+            await asyncio.sleep(0.05)
+
+        settings = Settings(
+            table_range=args.table_range, max_questions=args.questions,
+            time_limit=args.time_limit, game_mode=GameMode.NORMAL,
+        )
+        start = time.perf_counter()
+        sent = await asyncio.gather(*(
+            play(app_of(host, client), client, settings, args.pace) for client in clients
+        ))
+        elapsed = time.perf_counter() - start
+
+        for client in clients:
+            await client.close()
+        while host.sessions:
+            await asyncio.sleep(0.05)
+        await host.stop()
+
+    per_session = sum(sent) / len(sent)
+    say(f"{'low-bandwidth' if low_bandwidth else 'default':<14} {per_session / 1024:8.1f} KB/session "
+        f"{per_session / elapsed / 1024:7.1f} KB/s")
+    return per_session
+
+def run_in_process(low_bandwidth: bool, args) -> float:
+    return asyncio.run(run(low_bandwidth, args))
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--table-range", type=int, default=10)
+    parser.add_argument("--time-limit", type=int, default=60)
+    parser.add_argument("--pace", type=float, default=0.5, help="seconds between answers")
+    args = parser.parse_args()
+
+    # A spawned process imports Textual again, with the environment as it is
+    # now. Started first, hosted apps leave sys.stderr captured when they exit.
+    previous = os.environ.get("TEXTUAL_FPS")
+    os.environ["TEXTUAL_FPS"] = str(LOW_BANDWIDTH_FPS)
+    try:
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            low = pool.apply(run_in_process, (True, args))
+    finally:
+        if previous is None:
+            del os.environ["TEXTUAL_FPS"]
+        else:
+            os.environ["TEXTUAL_FPS"] = previous
+    default = asyncio.run(run(False, args))
+    say(f"low-bandwidth mode sends {(1 - low / default) * 100:.0f}% fewer bytes")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
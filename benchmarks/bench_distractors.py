@@ -0,0 +1,57 @@
+"""Microbenchmark for Simple mode problem generation.
+
+Times `MathGenerator.generate_problem` for every table range from 1 to 50
+and checks that the worst case stays flat as the range grows.
+
+Run from the project root:
+    python -m benchmarks.bench_distractors
+"""
+import argparse
+import sys
+import time
+
+from multipy.services.distractors import get_confusion_table
+from multipy.services.math_generator import MathGenerator
+
+def time_range(table_range: int, samples: int) -> list:
+    # Build the shared tables first, their one-off cost is not per problem
+    get_confusion_table(table_range)
+
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter_ns()
+        MathGenerator.generate_problem(table_range, simple_mode=True)
+        timings.append(time.perf_counter_ns() - start)
+    timings.sort()
+    return timings
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=20000, help="problems generated per range")
+    parser.add_argument("--max-range", type=int, default=50)
+    parser.add_argument("--tolerance", type=float, default=2.0,
+                        help="allowed p99 ratio between the largest and smallest range")
+    args = parser.parse_args()
+
+    print(f"{'range':>5} {'median ns':>10} {'p99 ns':>10} {'build ms':>9}")
+    p99s = {}
+    for table_range in range(1, args.max_range + 1):
+        start = time.perf_counter()
+        get_confusion_table(table_range)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        timings = time_range(table_range, args.samples)
+        median = timings[len(timings) // 2]
+        p99s[table_range] = timings[int(len(timings) * 0.99)]
+        print(f"{table_range:>5} {median:>10} {p99s[table_range]:>10} {build_ms:>9.2f}")
+
+    ratio = p99s[args.max_range] / max(p99s[1], 1)
+    print(f"p99 range {args.max_range} / range 1: {ratio:.2f}x")
+    if ratio > args.tolerance:
+        print("FAIL: worst-case generation time grows with the table range")
+        return 1
+    print("OK: worst-case generation time is flat")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
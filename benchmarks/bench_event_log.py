@@ -0,0 +1,85 @@
+"""Cost of the session event log, and a record/replay round trip.
+
+Measures the time to append one event, to scan a large log through mmap
+(record by record and as a NumPy array), then plays a scripted session in
+each game mode, replays its log through the app and checks that the
+replay gives the same answers.
+
+Run from the project root:
+    python -m benchmarks.bench_event_log
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from multipy.app import MultiPyApp
+from multipy.models import GameMode, Settings
+from multipy.services.event_log import EventKind, EventLog, EventLogWriter
+from benchmarks.headless import SyntheticAnswerer, drive_session, replay_session
+
+def bench_io(directory: Path, events: int) -> None:
+    writer = EventLogWriter(directory)
+    start = time.perf_counter_ns()
+    for i in range(events):
+        writer.log(EventKind.KEY_PRESSED, value=i)
+    elapsed = time.perf_counter_ns() - start
+    writer.close()
+    print(f"write:      {elapsed / events:8.0f} ns/event ({events} events)")
+
+    log = EventLog(writer.path)
+    start = time.perf_counter_ns()
+    keys = sum(1 for event in log if event.kind == EventKind.KEY_PRESSED)
+    elapsed = time.perf_counter_ns() - start
+    assert keys == events
+    print(f"scan:       {elapsed / events:8.0f} ns/event")
+
+    try:
+        start = time.perf_counter_ns()
+        array = log.as_array()
+        keys = int((array["kind"] == EventKind.KEY_PRESSED).sum())
+        elapsed = time.perf_counter_ns() - start
+        del array
+        print(f"scan NumPy: {elapsed / events:8.1f} ns/event")
+    except ImportError:
+        print("scan NumPy: skipped, NumPy is not installed")
+    log.close()
+
+def answers_of(results):
+    return [(r.factor_a, r.factor_b, r.given, r.correct) for r in results.answers]
+
+async def round_trip(directory: Path, settings: Settings, seed: int) -> bool:
+    app = MultiPyApp(history_path=None, event_log_dir=directory)
+    async with app.run_test() as pilot:
+        run = await drive_session(pilot, settings, SyntheticAnswerer(seed=seed))
+        # The newest log is the session just played
+        path = max(directory.glob("*.mpe"), key=lambda p: p.stat().st_mtime_ns)
+        log = EventLog(path)
+        start = time.perf_counter()
+        replayed = await replay_session(pilot, log)
+        elapsed = time.perf_counter() - start
+        log.close()
+    same = answers_of(run.results) == answers_of(replayed)
+    print(f"replay {settings.game_mode.name.lower():<7} {len(log):4d} events in {elapsed * 1000:6.1f} ms, "
+          f"{'identical' if same else 'DIFFERENT'} answers")
+    return same
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_io(Path(tmp) / "io", args.events)
+        ok = True
+        for game_mode in (GameMode.SIMPLE, GameMode.NORMAL):
+            settings = Settings(max_questions=args.questions, time_limit=300, game_mode=game_mode)
+            ok &= asyncio.run(round_trip(Path(tmp) / game_mode.name.lower(), settings, args.seed))
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
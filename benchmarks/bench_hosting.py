@@ -0,0 +1,106 @@
+"""Sessions per GB of RAM when many clients share one MultiPy host.
+
+Starts a `SessionHost` on localhost, connects local clients that start a
+practice session, and reports the resident memory per session. Exits with 1
+when not every session reached practice.
+
+Run from the project root:
+    python -m benchmarks.bench_hosting --clients 50
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from multipy.hosting import HANDSHAKE, SessionHost
+
+def say(message: str) -> None:
+    # Running apps redirect sys.stdout, write to the real one
+    print(message, file=sys.__stdout__, flush=True)
+
+class LocalClient:
+    """Connects like a terminal would, and counts the bytes it is sent."""
+
+    def __init__(self):
+        self.received = 0
+        self.reader = None
+        self.writer = None
+        self._drain_task = None
+
+    async def connect(self, port: int, size=(80, 24), name: str = "bench") -> None:
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(b"%s %d %d %s\n" % (HANDSHAKE, size[0], size[1], name.encode("ascii")))
+        self._drain_task = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        while True:
+            data = await self.reader.read(65536)
+            if not data:
+                return
+            self.received += len(data)
+
+    async def send_keys(self, keys: str) -> None:
+        self.writer.write(keys.encode("utf-8"))
+        await self.writer.drain()
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self._drain_task
+
+def press_start(app) -> None:
+    app.screen.query_one("#start-btn").press()
+
+async def run(args) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        host = SessionHost(
+            max_sessions=args.clients, history_dir=Path(tmp) / "clients",
+            event_log_dir=Path(tmp) / "events", log=None,
+        )
+        port = await host.start(port=0)
+
+        clients = [LocalClient() for _ in range(args.clients)]
+        start = time.perf_counter()
+        for number, client in enumerate(clients):
+            # A history per client, like a classroom
+            await client.connect(port, name=f"student{number}")
+        # Ready once every menu is drawn and has focused its first input
+        while len(host.sessions) < args.clients or any(app.focused is None for app in host.sessions):
+            await asyncio.sleep(0.05)
+        say(f"{args.clients} sessions up in {time.perf_counter() - start:.2f}s")
+
+        # Press the start button of every menu. Not by tabbing to it, that
+        # breaks whenever a field is added to the menu.
+        for app in host.sessions:
+            app.call_later(press_start, app)
+        deadline = time.perf_counter() + 30
+        while time.perf_counter() < deadline and any(type(app.screen).__name__ != "PracticeView" for app in host.sessions):
+            await asyncio.sleep(0.05)
+        practicing = sum(type(app.screen).__name__ == "PracticeView" for app in host.sessions)
+        await asyncio.sleep(args.settle)
+
+        say(f"{practicing}/{args.clients} sessions practicing")
+        say(host.report())
+        per_session_mb = host.memory_per_session / 1024 ** 2
+        say(f"memory per session: {per_session_mb:.1f} MB")
+        say(f"sessions per GB:    {host.sessions_per_gb:.0f}")
+
+        for client in clients:
+            await client.close()
+        while host.sessions:
+            await asyncio.sleep(0.05)
+        await host.stop()
+    if practicing < args.clients:
+        say("not every session reached practice, the numbers above are not comparable")
+        return 1
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to run sessions before measuring")
+    return asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Headless benchmark of the practice loop.
+
+Plays scripted sessions in Simple and Normal mode (with and without
+auto-submit) and reports transition latency, timer ticks per second, CPU time per session and peak memory.
+Results can be saved as a baseline and later runs compared against it.
+
+Run from the project root:
+    python -m benchmarks.bench_practice --save-baseline baseline.json
+    python -m benchmarks.bench_practice --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+from multipy.app import MultiPyApp
+from multipy.models import GameMode, Settings
+from benchmarks.headless import SessionRun, SyntheticAnswerer, drive_session
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+async def play(settings: Settings, sessions: int, seed: int) -> List[SessionRun]:
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Save and record sessions like a real run, but keep the user's history untouched
+        app = MultiPyApp(history_path=Path(tmp) / "history.db", event_log_dir=Path(tmp) / "events")
+        async with app.run_test() as pilot:
+            for i in range(sessions):
+                answerer = SyntheticAnswerer(seed=seed + i)
+                runs.append(await drive_session(pilot, settings, answerer))
+    return runs
+
+def peak_memory_kib(settings: Settings, seed: int) -> float:
+    # Measured in a separate session, tracemalloc would skew the timings
+    tracemalloc.start()
+    asyncio.run(play(settings, 1, seed))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+def summarize(runs: List[SessionRun]) -> Dict[str, float]:
+    latencies_ms = [ns / 1e6 for run in runs for ns in run.transition_ns]
+    return {
+        "transition_p50_ms": percentile(latencies_ms, 50),
+        "transition_p95_ms": percentile(latencies_ms, 95),
+        "transition_p99_ms": percentile(latencies_ms, 99),
+        "ticks_per_second": sum(run.ticks for run in runs) / sum(run.wall_seconds for run in runs),
+        "cpu_ms_per_session": sum(run.cpu_seconds for run in runs) / len(runs) * 1000,
+    }
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Every metric is lower-is-better, flag the ones that grew past the tolerance."""
+    regressions = []
+    for mode, metrics in current.items():
+        for name, value in metrics.items():
+            before = baseline.get(mode, {}).get(name)
+            if before and value > before * (1 + tolerance):
+                regressions.append(f"{mode}.{name}: {before:.2f} -> {value:.2f}")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=3, help="sessions per game mode")
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--table-range", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="fail if a metric regressed against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative regression (default: 0.25)")
+    args = parser.parse_args()
+
+    report = {}
+    # Normal mode with auto-submit measures from the last key press instead of Enter
+    for name, game_mode, auto_submit in (
+        ("simple", GameMode.SIMPLE, False),
+        ("normal", GameMode.NORMAL, False),
+        ("normal_auto", GameMode.NORMAL, True),
+    ):
+        settings = Settings(
+            table_range=args.table_range,
+            max_questions=args.questions,
+            time_limit=300,
+            game_mode=game_mode,
+            auto_submit=auto_submit,
+        )
+        runs = asyncio.run(play(settings, args.sessions, args.seed))
+        metrics = summarize(runs)
+        metrics["peak_memory_kib"] = peak_memory_kib(settings, args.seed)
+        report[name] = metrics
+
+    for mode, metrics in report.items():
+        print(f"[{mode}]")
+        for name, value in metrics.items():
+            print(f"  {name:<20} {value:>10.2f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("FAIL: regressions against baseline")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("OK: no regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""Result upload throughput and recovery, against a local stand-in server.
+
+Runs a small HTTP/1.1 results server on localhost that stores sessions by
+id and counts connections, requests and duplicates, then:
+
+  throughput  uploads --sessions sessions and reports sessions per second
+              and how many connections were needed
+  outage      queues sessions while the server answers 503, closes the
+              uploader, and checks that a new one sends them all once the
+              server is back
+  crash       kills a process that is mid-upload to a slow server and
+              checks that every session was delivered or spooled, and that
+              the next uploader sends the ones it left
+  auth        answers 401 and checks that the uploader keeps the sessions
+              and stops sending until it gets a new token
+
+Run from the project root:
+    python -m benchmarks.bench_upload --sessions 2000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from multipy.models import GameMode, SessionResults, Settings
+from multipy.services.uploader import ResultUploader
+
+class ResultsServer(ThreadingHTTPServer):
+    """Stand-in for the district results server."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ResultsHandler)
+        self.lock = threading.Lock()
+        self.session_ids = set()
+        self.duplicates = 0
+        self.requests = 0
+        self.connections = 0
+        # Answer this status instead of storing, e.g. 503 for an outage
+        self.fail_status = None
+        # Seconds to wait before answering
+        self.delay = 0.0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/results"
+
+class ResultsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if server.delay:
+            time.sleep(server.delay)
+        with server.lock:
+            server.requests += 1
+            status = server.fail_status
+            if status is None:
+                for session in json.loads(body)["sessions"]:
+                    if session["id"] in server.session_ids:
+                        server.duplicates += 1
+                    server.session_ids.add(session["id"])
+        self.send_response(status or 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+def sample_session(seed: int):
+    results = SessionResults(total_questions=20, correct_answers=17, mistakes=3, elapsed_time=41.5, best_streak=9)
+    for i in range(20):
+        a, b = (seed + i) % 10 + 1, (seed * 7 + i) % 10 + 1
+        results.answers.record(a, b, a * b if i % 7 else a * b + 1, i % 7 != 0, 1_500_000_000 + i * 1_000_000)
+    return Settings(table_range=10, max_questions=20, game_mode=GameMode.NORMAL), results
+
+def wait_until(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+def bench_throughput(spool: Path, sessions: int) -> bool:
+    server = ResultsServer()
+    uploader = ResultUploader(server.url, spool_dir=spool)
+    samples = [sample_session(i) for i in range(sessions)]
+    start = time.perf_counter()
+    enqueue_ns = time.perf_counter_ns()
+    for settings, results in samples:
+        uploader.enqueue(settings, results)
+    enqueue_ns = (time.perf_counter_ns() - enqueue_ns) / sessions
+    done = wait_until(lambda: len(server.session_ids) >= sessions, 120)
+    elapsed = time.perf_counter() - start
+    uploader.close()
+    server.shutdown()
+    print(f"throughput: {sessions / elapsed:8.0f} sessions/s, {server.requests} requests over "
+          f"{server.connections} connection(s), enqueue {enqueue_ns / 1000:.1f} us")
+    return done and server.duplicates == 0
+
+def bench_outage(spool: Path, sessions: int) -> bool:
+    server = ResultsServer()
+    server.fail_status = 503
+    uploader = ResultUploader(server.url, spool_dir=spool, backoff_base=0.05, backoff_max=0.2)
+    for i in range(sessions):
+        uploader.enqueue(*sample_session(i))
+    wait_until(lambda: server.requests >= 3, 10)
+    uploader.close()
+    retries = server.requests
+    spooled = len(list(spool.glob("*.json")))
+
+    server.fail_status = None
+    resumed = ResultUploader(server.url, spool_dir=spool)
+    resumed.start()
+    done = wait_until(lambda: len(server.session_ids) >= sessions, 60)
+    resumed.close()
+    server.shutdown()
+    print(f"outage:     {retries} failed attempts with backoff, {spooled} spooled, "
+          f"{len(server.session_ids)}/{sessions} delivered after restart")
+    return done and spooled == sessions
+
+def _upload_then_crash(url: str, spool: str, sessions: int) -> None:
+    uploader = ResultUploader(url, spool_dir=spool, batch_size=10)
+    for i in range(sessions):
+        uploader.enqueue(*sample_session(i))
+    # Killed in the middle of the slow uploads, nothing gets to clean up
+    time.sleep(0.5)
+    os._exit(1)
+
+def bench_crash(spool: Path, sessions: int) -> bool:
+    server = ResultsServer()
+    server.delay = 0.2
+    process = multiprocessing.get_context("spawn").Process(
+        target=_upload_then_crash, args=(server.url, str(spool), sessions),
+    )
+    process.start()
+    process.join()
+    before = len(server.session_ids)
+    left = len(list(spool.glob("*.json")))
+
+    server.delay = 0.0
+    resumed = ResultUploader(server.url, spool_dir=spool)
+    resumed.start()
+    done = wait_until(lambda: len(server.session_ids) >= sessions, 60)
+    resumed.close()
+    server.shutdown()
+    print(f"crash:      {before} delivered before the crash, {left} left spooled, "
+          f"{len(server.session_ids)}/{sessions} delivered after restart, {server.duplicates} duplicate(s)")
+    # Delivered and spooled can overlap, a confirmed batch may not be deleted yet
+    return done and before + left >= sessions
+
+def bench_auth(spool: Path, sessions: int) -> bool:
+    server = ResultsServer()
+    server.fail_status = 401
+    uploader = ResultUploader(server.url, spool_dir=spool, token="expired", batch_size=10)
+    for i in range(sessions):
+        uploader.enqueue(*sample_session(i))
+    wait_until(lambda: server.requests >= 1, 10)
+    # Give it time to (wrongly) go on sending
+    time.sleep(0.5)
+    refused = server.requests
+    kept = len(list(spool.glob("*.json")))
+    rejected = len(list((spool / "rejected").glob("*.json")))
+
+    server.fail_status = None
+    uploader.set_token("renewed")
+    done = wait_until(lambda: len(server.session_ids) >= sessions, 60)
+    uploader.close()
+    server.shutdown()
+    print(f"auth:       {refused} request(s) refused, {kept} kept, {rejected} rejected, "
+          f"{len(server.session_ids)}/{sessions} delivered after a new token")
+    return done and refused == 1 and kept == sessions and rejected == 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--recovery-sessions", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = bench_throughput(Path(tmp) / "throughput", args.sessions)
+        ok &= bench_outage(Path(tmp) / "outage", args.recovery_sessions)
+        ok &= bench_crash(Path(tmp) / "crash", args.recovery_sessions)
+        ok &= bench_auth(Path(tmp) / "auth", args.recovery_sessions)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""Worksheet generation throughput for 1 to N worker processes.
+
+Generates the same run of worksheets with every worker count from 1 to
+--max-workers (default: one per core) and reports sheets per second and
+the speedup over a single worker.
+
+Run from the project root:
+    python -m benchmarks.bench_worksheets --count 2000 --format pdf
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from multipy.models import GameMode, Settings
+from multipy.worksheets import FORMATS, generate_worksheets
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000, help="worksheets per run")
+    parser.add_argument("--problems", type=int, default=30)
+    parser.add_argument("--table-range", type=int, default=12)
+    parser.add_argument("--mode", choices=("normal", "simple"), default="normal")
+    parser.add_argument("--format", choices=FORMATS, default="txt")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    settings = Settings(
+        table_range=args.table_range,
+        max_questions=args.problems,
+        game_mode=GameMode.SIMPLE if args.mode == "simple" else GameMode.NORMAL,
+    )
+    print(f"{args.count} {args.format} worksheets, {args.problems} problems, {args.mode} mode, {os.cpu_count()} cores")
+    print(f"{'workers':>7} {'seconds':>8} {'sheets/s':>9} {'speedup':>8}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in range(1, args.max_workers + 1):
+            start = time.perf_counter()
+            generate_worksheets(tmp, args.count, settings, fmt=args.format, workers=workers)
+            elapsed = time.perf_counter() - start
+            rate = args.count / elapsed
+            baseline = baseline or rate
+            print(f"{workers:>7} {elapsed:>8.2f} {rate:>9.0f} {rate / baseline:>7.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
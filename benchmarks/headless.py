@@ -0,0 +1,189 @@
+"""Headless driver for MultiPy sessions.
+
+Runs `MultiPyApp` through Textual's Pilot, fills in the menu, and answers
+every problem with a scripted `SyntheticAnswerer`, or replays a recorded
+event log.
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from textual.widgets import Button, Input, Select, Switch
+
+from multipy.models import GameMode, SessionResults, Settings
+from multipy.services.event_log import EventKind, EventLog
+from multipy.services.math_generator import MathProblem
+from multipy.views.menu_view import NO_PACK
+from multipy.views.practice_view import PracticeView
+from multipy.views.summary_view import SummaryView
+
+MODE_LABELS = {
+    GameMode.SIMPLE: "Simple (Buttons)",
+    GameMode.NORMAL: "Normal (Typing)",
+}
+
+class SyntheticAnswerer:
+    """Answers correctly with probability `accuracy`, otherwise picks a wrong answer."""
+
+    def __init__(self, accuracy: float = 0.8, seed: Optional[int] = None):
+        self.accuracy = accuracy
+        self.rng = random.Random(seed)
+
+    def answer(self, problem: MathProblem) -> int:
+        if self.rng.random() < self.accuracy:
+            return problem.answer
+        if problem.options:
+            return self.rng.choice([opt for opt in problem.options if opt != problem.answer])
+        offset = self.rng.choice((-1, 1)) * self.rng.randint(1, 5)
+        # The answer field takes digits only, a negative answer would never be submitted
+        return problem.answer + offset if problem.answer + offset >= 0 else problem.answer - offset
+
+@dataclass
+class SessionRun:
+    """What the driver observed during one session."""
+    game_mode: GameMode
+    results: SessionResults
+    # Time from submitting an answer until the next problem (or the summary) is shown
+    transition_ns: List[int] = field(default_factory=list)
+    ticks: int = 0
+    tick_ns: int = 0
+    cpu_seconds: float = 0.0
+    wall_seconds: float = 0.0
+
+    @property
+    def ticks_per_second(self) -> float:
+        if self.wall_seconds > 0:
+            return self.ticks / self.wall_seconds
+        return 0.0
+
+async def configure_menu(pilot, settings: Settings) -> None:
+    screen = pilot.app.screen
+    screen.query_one("#range-input", Input).value = str(settings.table_range)
+    screen.query_one("#questions-input", Input).value = str(settings.max_questions)
+    screen.query_one("#time-input", Input).value = str(settings.time_limit)
+    screen.query_one("#question-time-input", Input).value = str(settings.question_time_limit)
+    screen.query_one("#mode-select", Select).value = MODE_LABELS[settings.game_mode]
+    screen.query_one("#adaptive-switch", Switch).value = settings.adaptive
+    screen.query_one("#auto-submit-switch", Switch).value = settings.auto_submit
+    pack_select = screen.query_one("#pack-select", Select)
+    if settings.pack_path:
+        # The pack may live outside the folder the menu lists
+        pack_select.set_options([("Table range", NO_PACK), (settings.pack_path, settings.pack_path)])
+    pack_select.value = settings.pack_path or NO_PACK
+    await pilot.pause()
+
+async def submit_answer(view: PracticeView, value: int) -> None:
+    """Submit `value` through the same widget messages a user would trigger.
+
+    Pilot's simulated clicks and key presses wait for the CPU to go idle,
+    which would dominate the timings, so the widgets are driven directly.
+    """
+    if view.settings.game_mode == GameMode.SIMPLE:
+        for i, opt in enumerate(view.current_problem.options):
+            if opt == value:
+                view.query_one(f"#answer-btn-{i}", Button).press()
+                return
+        raise ValueError(f"{value} is not one of the options")
+    await view.query_one("#answer-input", Input).action_submit()
+
+async def wait_for_answer(pilot, view: PracticeView, answered: int) -> None:
+    """Wait until answer number `answered` was handled and the screen repainted."""
+    while view.results.total_questions < answered and pilot.app.screen is view:
+        await asyncio.sleep(0)
+    repainted = asyncio.Event()
+    pilot.app.call_after_refresh(repainted.set)
+    await repainted.wait()
+
+async def drive_session(pilot, settings: Settings, answerer: SyntheticAnswerer) -> SessionRun:
+    """Play one session from the menu to the summary screen, then return to the menu."""
+    await configure_menu(pilot, settings)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    # Pressed directly, the button can be below the fold of the test terminal
+    pilot.app.screen.query_one("#start-btn", Button).press()
+    await pilot.pause()
+
+    view = pilot.app.screen
+    assert isinstance(view, PracticeView), f"expected PracticeView, got {view!r}"
+    run = SessionRun(game_mode=settings.game_mode, results=view.results)
+
+    while isinstance(pilot.app.screen, PracticeView):
+        value = answerer.answer(view.current_problem)
+        auto_submitted = settings.auto_submit and len(str(value)) == len(str(view.current_problem.answer))
+        if settings.game_mode == GameMode.NORMAL:
+            # Typing is the learner's time, only the submit is measured. With
+            # auto-submit that is the last key press.
+            typed = str(value)[:-1] if auto_submitted else str(value)
+            if typed:
+                await pilot.press(*typed)
+        answered = view.results.total_questions + 1
+        start = time.perf_counter_ns()
+        if auto_submitted:
+            view.query_one("#answer-input", Input).insert_text_at_cursor(str(value)[-1])
+        else:
+            await submit_answer(view, value)
+        await wait_for_answer(pilot, view, answered)
+        run.transition_ns.append(time.perf_counter_ns() - start)
+        await pilot.pause()
+
+    run.cpu_seconds = time.process_time() - cpu_start
+    run.wall_seconds = time.perf_counter() - wall_start
+    run.results = view.results
+    run.ticks = view.tick_stats.ticks
+    run.tick_ns = view.tick_stats.total_ns
+
+    assert isinstance(pilot.app.screen, SummaryView), f"expected SummaryView, got {pilot.app.screen!r}"
+    pilot.app.screen.query_one("#menu-btn", Button).press()
+    await pilot.pause()
+    await pilot.pause()
+    return run
+
+async def replay_session(pilot, log: EventLog, speed: Optional[float] = None) -> SessionResults:
+    """Replay a recorded session through the app and return its results.
+
+    The practice screen asks the recorded problems, and the recorded key
+    presses, answers and timer expiries are fed back in order. With `speed`
+    the original pacing is kept (2.0 is twice as fast), otherwise events
+    are replayed back to back. The summary is left open.
+    """
+    settings = log.settings()
+    if settings is None:
+        raise ValueError(f"{log.path} has no session start")
+    pilot.app.start_practice(settings, replay=log)
+    await pilot.pause()
+    view = pilot.app.screen
+    assert isinstance(view, PracticeView), f"expected PracticeView, got {view!r}"
+
+    replay_start = time.monotonic_ns()
+    shown = 0
+    for event in log:
+        if not isinstance(pilot.app.screen, PracticeView):
+            break
+        if speed:
+            delay = event.t_ns / speed - (time.monotonic_ns() - replay_start)
+            if delay > 0:
+                await asyncio.sleep(delay / 1e9)
+
+        if event.kind == EventKind.PROBLEM_SHOWN:
+            shown += 1
+            problem = view.current_problem
+            if (problem.factor_a, problem.factor_b) != (event.a, event.b):
+                raise AssertionError(f"problem {shown} differs from the log: {problem} != {event}")
+        elif event.kind == EventKind.KEY_PRESSED:
+            view.query_one("#answer-input", Input).value = "" if event.value < 0 else str(event.value)
+        elif event.kind == EventKind.ANSWER_SUBMITTED:
+            answered = view.results.total_questions + 1
+            if settings.game_mode == GameMode.NORMAL:
+                view.query_one("#answer-input", Input).value = str(event.value)
+            await submit_answer(view, event.value)
+            await wait_for_answer(pilot, view, answered)
+        elif event.kind == EventKind.TIMER_EXPIRED:
+            if event.a == 0:
+                view.on_time_up()
+            else:
+                view.on_question_timeout()
+            await pilot.pause()
+    await pilot.pause()
+    return view.results
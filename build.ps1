@@ -1,5 +1,10 @@
 # Build script for creating MultiPy.exe
 # Run this script to build the Windows executable
+# Use -FastStart to build a folder (dist\MultiPy\) that launches faster than the single exe
+
+param(
+    [switch]$FastStart
+)
 
 Write-Host "=== MultiPy Build Script ===" -ForegroundColor Green
 Write-Host ""
@@ -24,19 +29,27 @@ Write-Host "Building MultiPy.exe..." -ForegroundColor Yellow
 Write-Host ""
 
 # Run PyInstaller
-# Note: Since MultiPy.spec might not exist yet, we'll use a basic command first.
-# If you create a spec file later, change this line to: pyinstaller --clean --noconfirm MultiPy.spec
-pyinstaller --clean --noconfirm --name MultiPy --onefile --windowed run.py
+if ($FastStart) {
+    $env:MULTIPY_BUILD = "onedir"
+    $exePath = "dist\MultiPy\MultiPy.exe"
+} else {
+    $env:MULTIPY_BUILD = "onefile"
+    $exePath = "dist\MultiPy.exe"
+}
+pyinstaller --clean --noconfirm MultiPy.spec
 
 if ($LASTEXITCODE -eq 0) {
     Write-Host ""
     Write-Host "=== Build Complete! ===" -ForegroundColor Green
     Write-Host ""
     Write-Host "Your executable is located at:" -ForegroundColor Cyan
-    Write-Host "  dist\MultiPy.exe" -ForegroundColor White
+    Write-Host "  $exePath" -ForegroundColor White
     Write-Host ""
     Write-Host "To run the app:" -ForegroundColor Yellow
-    Write-Host "  .\dist\MultiPy.exe" -ForegroundColor White
+    Write-Host "  .\$exePath" -ForegroundColor White
+    Write-Host ""
+    Write-Host "To check the launch time:" -ForegroundColor Yellow
+    Write-Host "  .\$exePath --startup-profile" -ForegroundColor White
 } else {
     Write-Host ""
     Write-Host "Build failed! Check the error messages above." -ForegroundColor Red
@@ -1,5 +1,17 @@
+import sys
+import time
+from functools import partial
+
 from textual.app import App
+from multipy.services.bandwidth import OutputCounter, counting_driver
+from multipy.services.history import HistoryStore, default_history_path
+from multipy.services.event_log import default_event_log_dir, prune_event_logs
 from multipy.views.menu_view import MenuView
+from multipy.views.stylesheet import SharedStylesheet
+
+# Default of the path arguments, resolved when an app is created so that
+# importing never touches the home directory. None turns the feature off.
+DEFAULT = object()
 
 class MultiPyApp(App):
     CSS = """
@@ -12,8 +24,112 @@ class MultiPyApp(App):
         ("q", "quit", "Quit"),
     ]
 
+    def __init__(self, history_path=DEFAULT, exit_after_first_paint: bool = False,
+                 event_log_dir=DEFAULT, low_bandwidth: bool = False,
+                 count_output: bool = False, uploader=None, history=None, **kwargs):
+        super().__init__(**kwargs)
+        # Set (perf_counter) once the menu has been drawn for the first time
+        self.first_paint_time = None
+        self.exit_after_first_paint = exit_after_first_paint
+        self.stylesheet = SharedStylesheet(variables=self.get_css_variables())
+        if history_path is DEFAULT:
+            history_path = default_history_path()
+        if event_log_dir is DEFAULT:
+            event_log_dir = default_event_log_dir()
+        # Pass history_path=None to run without saving sessions, or a
+        # HistoryStore as `history` to share one, which the caller then closes
+        self._owns_history = history is None
+        if history is None and history_path is not None:
+            history = HistoryStore(history_path, on_drop=self._on_history_drop)
+        self.history = history
+        # Every session is recorded there for replay, None to record nothing
+        self.event_log_dir = event_log_dir
+        # Per-fact counts over every stored session, loaded on first use
+        self._lifetime_mastery = None
+        # Coarse progress and plain problems, see multipy.services.bandwidth
+        self.low_bandwidth = low_bandwidth
+        if low_bandwidth:
+            self.animation_level = "none"
+        # ResultUploader for finished sessions, owned (started and closed) by the caller
+        self.uploader = uploader
+        # Bytes written to the terminal, None unless count_output is set
+        self.output_counter = None
+        if count_output:
+            self.output_counter = OutputCounter()
+            self.driver_class = counting_driver(self.driver_class)
+
     def on_mount(self) -> None:
         self.push_screen(MenuView())
+        self.call_after_refresh(self._on_first_paint)
+        self.start_event_log_pruning()
+
+    def start_event_log_pruning(self) -> None:
+        """Delete the oldest session recordings on a worker thread."""
+        if self.event_log_dir is not None:
+            self.run_worker(
+                partial(prune_event_logs, self.event_log_dir), thread=True,
+                group="prune-event-logs", exit_on_error=False,
+            )
+
+    def start_practice(self, settings, replay=None) -> None:
+        """Show the practice screen for a new session.
+
+        The practice and summary screens are installed once and reset for
+        every session, so their widgets are only built the first time.
+        Pass an `EventLog` as `replay` to play the problems of a recorded
+        session, see `PracticeView.reset`.
+        """
+        if not self.is_screen_installed("practice"):
+            from multipy.views.practice_view import PracticeView
+            self.install_screen(PracticeView(), "practice")
+        self.get_screen("practice").reset(settings, replay)
+        self.push_screen("practice")
+
+    def show_summary(self, results, settings, mastery=None, metrics=None) -> None:
+        if self.is_screen_installed("summary") and self.get_screen("summary") in self.screen_stack:
+            # Already shown for this session
+            return
+        if not self.is_screen_installed("summary"):
+            from multipy.views.summary_view import SummaryView
+            self.install_screen(SummaryView(), "summary")
+        if mastery is not None and self._lifetime_mastery is not None:
+            # Sessions before the first load are read from the history
+            self._lifetime_mastery.merge(mastery)
+        self.get_screen("summary").reset(results, settings, mastery, metrics)
+        self.push_screen("summary")
+
+    def lifetime_mastery(self):
+        """The `MasteryMatrix` of every stored session.
+
+        Built from the history once, then every finished session is merged in.
+        """
+        if self._lifetime_mastery is None:
+            from multipy.models import MAX_TABLE_RANGE
+            from multipy.services.mastery import MasteryMatrix
+            self._lifetime_mastery = MasteryMatrix()
+            if self.history is not None:
+                # Sessions still queued for writing must be part of the load
+                self.history.flush()
+                self._lifetime_mastery.load_stats(self.history.fact_stats(MAX_TABLE_RANGE, sessions=None))
+        return self._lifetime_mastery
+
+    def _on_history_drop(self, sessions: int, error: Exception) -> None:
+        # Runs on the history writer thread
+        message = f"{sessions} finished session(s) could not be saved: {error}"
+        try:
+            self.call_from_thread(self.notify, message, title="History", severity="error", timeout=10)
+        except RuntimeError:
+            # The app is not running (any more)
+            print(message, file=sys.__stderr__)
+
+    def _on_first_paint(self) -> None:
+        self.first_paint_time = time.perf_counter()
+        if self.exit_after_first_paint:
+            self.exit()
+
+    def on_unmount(self) -> None:
+        if self.history is not None and self._owns_history:
+            self.history.close()
 
 if __name__ == "__main__":
     app = MultiPyApp()
@@ -0,0 +1,160 @@
+"""Export the session history to CSV or Parquet for spreadsheets.
+
+Rows are streamed from the history database in chunks and written as they
+arrive, so memory use stays flat no matter how large the history is.
+
+    python export.py answers.csv
+    python export.py sessions.parquet --kind sessions --since 2026-09-01 --max-table 12
+
+Times are exported in UTC, and --since and --until are UTC days.
+Parquet export needs pyarrow (pip install pyarrow).
+"""
+import argparse
+import csv
+import sys
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from multipy.services.history import (
+    ANSWER_EXPORT_COLUMNS,
+    EXPORT_CHUNK_ROWS,
+    SESSION_EXPORT_COLUMNS,
+    HistoryStore,
+    default_history_path,
+)
+
+KINDS = ("answers", "sessions")
+FORMATS = ("csv", "parquet")
+# Position of finished_at in both kinds of rows
+FINISHED_AT = 1
+
+@lru_cache(maxsize=1024)
+def _utc_time(timestamp: float) -> datetime:
+    # Answers of one session share the timestamp, so this is mostly cache hits
+    return datetime.fromtimestamp(int(timestamp), timezone.utc)
+
+def _readable(chunk):
+    return [row[:FINISHED_AT] + (_utc_time(row[FINISHED_AT]),) + row[FINISHED_AT + 1:] for row in chunk]
+
+def _parquet_schema(kind: str):
+    import pyarrow as pa
+
+    int_ = pa.int64()
+    utc = pa.timestamp("s", tz="UTC")
+    if kind == "sessions":
+        types = (int_, utc, int_, int_, int_, pa.string(),
+                 int_, int_, int_, pa.float64(), int_, pa.float64(), pa.bool_(), pa.string())
+        columns = SESSION_EXPORT_COLUMNS
+    else:
+        types = (int_, utc, int_, pa.string(), int_,
+                 int_, int_, int_, int_, pa.bool_(), pa.float64(), pa.bool_(), pa.string())
+        columns = ANSWER_EXPORT_COLUMNS
+    return pa.schema(list(zip(columns, types)))
+
+def _write_csv(chunks, columns, destination) -> int:
+    written = 0
+    if destination == "-":
+        out = sys.stdout
+    else:
+        out = open(destination, "w", newline="", encoding="utf-8")
+    try:
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        for chunk in chunks:
+            writer.writerows(_readable(chunk))
+            written += len(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return written
+
+def _write_parquet(chunks, kind: str, destination) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow, install it with: pip install pyarrow") from None
+
+    schema = _parquet_schema(kind)
+    written = 0
+    # Every chunk becomes one row group
+    with pq.ParquetWriter(str(destination), schema) as writer:
+        for chunk in chunks:
+            columns = zip(*_readable(chunk))
+            arrays = [pa.array(column).cast(field.type) for column, field in zip(columns, schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            written += len(chunk)
+    return written
+
+def export_history(store: HistoryStore, destination, kind: str = "answers", fmt: Optional[str] = None,
+                   since: Optional[float] = None, until: Optional[float] = None,
+                   min_table: Optional[int] = None, max_table: Optional[int] = None,
+                   chunk_size: int = EXPORT_CHUNK_ROWS) -> int:
+    """Write the matching sessions or answers to `destination`, returns the rows written.
+
+    The format is taken from the file suffix unless `fmt` is given. A
+    destination of "-" writes CSV to stdout. The filters are the ones of
+    `HistoryStore.iter_session_rows`.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}, not {kind!r}")
+    if fmt is None:
+        fmt = "csv" if destination == "-" else Path(destination).suffix.lstrip(".").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}, not {fmt!r}")
+
+    iter_rows = store.iter_session_rows if kind == "sessions" else store.iter_answer_rows
+    chunks = iter_rows(since=since, until=until, min_table=min_table, max_table=max_table, chunk_size=chunk_size)
+    if fmt == "parquet":
+        return _write_parquet(chunks, kind, destination)
+    columns = SESSION_EXPORT_COLUMNS if kind == "sessions" else ANSWER_EXPORT_COLUMNS
+    return _write_csv(chunks, columns, destination)
+
+def _date(text: str) -> datetime:
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a date like 2026-09-01, got {text!r}") from None
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export the MultiPy session history to CSV or Parquet.")
+    parser.add_argument("output", help="file to write, .csv or .parquet, or - for CSV on stdout")
+    parser.add_argument("--kind", choices=KINDS, default="answers",
+                        help="one row per answer (default) or one row per session")
+    parser.add_argument("--format", choices=FORMATS, help="override the format taken from the file suffix")
+    parser.add_argument("--since", type=_date, help="first day to include, YYYY-MM-DD in UTC")
+    parser.add_argument("--until", type=_date, help="last day to include, YYYY-MM-DD in UTC")
+    parser.add_argument("--min-table", type=int, help="only sessions with at least this table range")
+    parser.add_argument("--max-table", type=int, help="only sessions with at most this table range")
+    parser.add_argument("--history", default=str(default_history_path()), help="history database to read")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_ROWS, help="rows read and written at a time")
+    args = parser.parse_args(argv)
+
+    if not Path(args.history).exists():
+        print(f"No history found at {args.history}", file=sys.stderr)
+        return 1
+
+    store = HistoryStore(args.history)
+    try:
+        written = export_history(
+            store, args.output, kind=args.kind, fmt=args.format,
+            since=args.since.timestamp() if args.since else None,
+            # Until is inclusive on the command line, exclusive in the store
+            until=(args.until + timedelta(days=1)).timestamp() if args.until else None,
+            min_table=args.min_table, max_table=args.max_table,
+            chunk_size=args.chunk_size,
+        )
+    except (RuntimeError, ValueError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+
+    if args.output != "-":
+        print(f"Wrote {written} {args.kind} rows to {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""Serve many MultiPy sessions from one asyncio process.
+
+Every client connection gets its own `MultiPyApp`, all of them running in a
+single event loop. Fact decks, confusion tables, glyphs and parsed CSS are
+process-wide caches, so they are built once and shared by every session.
+
+Start a host and connect to it from a terminal:
+    python serve.py --port 7007
+    python serve.py --connect 127.0.0.1:7007 --name alice
+
+Every client name gets its own history database, so one student's answers
+never change the adaptive weights or statistics of another.
+"""
+import argparse
+import asyncio
+import os
+import re
+import shutil
+import sys
+from codecs import getincrementaldecoder
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from textual import events
+from textual._xterm_parser import XTermParser
+from textual.driver import Driver
+from textual.geometry import Size
+
+from multipy.app import DEFAULT, MultiPyApp
+from multipy.models import MAX_TABLE_RANGE
+from multipy.services.bandwidth import LOW_BANDWIDTH_FPS, cap_frame_rate
+from multipy.services.distractors import get_confusion_table
+from multipy.services.event_log import default_event_log_dir
+from multipy.services.history import HistoryStore, default_history_path
+from multipy.services.uploader import ResultUploader
+from multipy.views.glyphs import warm_glyph_cache
+
+# First line a client sends: "MULTIPY <columns> <rows> [<client name>]"
+HANDSHAKE = b"MULTIPY"
+# Client names double as history file names
+CLIENT_NAME = re.compile(rb"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+SHARED_HISTORY_NAME = "shared.db"
+DEFAULT_SIZE = (80, 24)
+# How long the input parser may wait before a lone escape counts as a key
+PARSER_TICK_SECONDS = 0.1
+
+def current_rss_bytes() -> int:
+    """Resident memory of this process."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        # Peak instead of current outside Linux, still an upper bound
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes everywhere else
+        return peak if sys.platform == "darwin" else peak * 1024
+
+class ClientConnection:
+    """The stream pair and terminal size of one connected client."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, size=DEFAULT_SIZE,
+                 name: Optional[str] = None):
+        self.reader = reader
+        self.writer = writer
+        self.size = size
+        # Sent by the client, None when it did not give one
+        self.name = name
+
+class StreamDriver(Driver):
+    """Textual driver that talks to a client over an asyncio stream.
+
+    The app must have a `client` attribute holding a `ClientConnection`.
+    """
+
+    def __init__(self, app, **kwargs):
+        super().__init__(app, **kwargs)
+        self._client: ClientConnection = app.client
+        self._input_task: Optional[asyncio.Task] = None
+
+    def write(self, data: str) -> None:
+        if not self._client.writer.is_closing():
+            self._client.writer.write(data.encode("utf-8"))
+
+    def start_application_mode(self) -> None:
+        width, height = self._client.size
+        size = Size(width, height)
+        self.send_message(events.Resize(size, size))
+
+        self.write("\x1b[?1049h")  # Alt screen
+        if self._mouse:
+            self.write("\x1b[?1000h\x1b[?1003h\x1b[?1015h\x1b[?1006h")
+        self.write("\x1b[?25l")  # Hide cursor
+        self._input_task = asyncio.create_task(self._read_input())
+
+    async def _read_input(self) -> None:
+        parser = XTermParser(self._debug)
+        decode = getincrementaldecoder("utf-8")(errors="replace").decode
+        reader = self._client.reader
+        while True:
+            try:
+                data = await asyncio.wait_for(reader.read(4096), PARSER_TICK_SECONDS)
+            except asyncio.TimeoutError:
+                for event in parser.tick():
+                    self.process_message(event)
+                continue
+            except (ConnectionError, OSError):
+                data = b""
+            if not data:
+                # Client went away, end its session
+                self._app.call_later(self._app.exit)
+                return
+            for event in parser.feed(decode(data)):
+                self.process_message(event)
+
+    def disable_input(self) -> None:
+        if self._input_task is not None:
+            self._input_task.cancel()
+            self._input_task = None
+
+    def stop_application_mode(self) -> None:
+        self.disable_input()
+        if self._mouse:
+            self.write("\x1b[?1000l\x1b[?1003l\x1b[?1015l\x1b[?1006l")
+        self.write("\x1b[?1049l")  # Leave alt screen
+        self.write("\x1b[?25h")  # Show cursor
+        self._client.writer.close()
+
+class HostedApp(MultiPyApp):
+    """A MultiPy session served to one client."""
+
+    def __init__(self, client: ClientConnection, **kwargs):
+        self.client = client
+        super().__init__(driver_class=StreamDriver, **kwargs)
+
+class SessionHost:
+    """Accepts clients and runs one `HostedApp` per connection.
+
+    New connections are turned away once `max_sessions` are active or the
+    process uses more than `memory_limit` bytes. The memory used per session
+    is measured as the growth of the process since the shared caches were
+    warmed, divided by the active sessions.
+
+    Every client name gets its own history database in `history_dir`, used
+    by all connections with that name. Clients that send no name practise
+    without a history. With `shared_history` every client reads and writes
+    one database instead, so all of them share the adaptive weights and
+    statistics, for a single learner using several terminals. A
+    `history_dir` of None keeps no history at all.
+    """
+
+    def __init__(self, max_sessions: int = 100, memory_limit: Optional[int] = None,
+                 history_dir=DEFAULT, shared_history: bool = False, event_log_dir=DEFAULT,
+                 low_bandwidth: bool = False, uploader=None, log=sys.__stderr__):
+        if history_dir is DEFAULT:
+            history_dir = default_history_path().parent / "clients"
+        if event_log_dir is DEFAULT:
+            event_log_dir = default_event_log_dir()
+        self.max_sessions = max_sessions
+        self.memory_limit = memory_limit
+        self.history_dir = Path(history_dir) if history_dir is not None else None
+        self.shared_history = shared_history
+        # Client name -> (store, connected sessions using it)
+        self._histories: Dict[str, List] = {}
+        self.event_log_dir = event_log_dir
+        # Passed to every session, the frame rate cap is up to the caller
+        self.low_bandwidth = low_bandwidth
+        # One ResultUploader, and so one connection, shared by every session
+        self.uploader = uploader
+        self.log = log
+        self.sessions: Set[HostedApp] = set()
+        self.peak_sessions = 0
+        self.base_rss = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    def warm_shared_caches(self, table_range: int = 10) -> None:
+        """Build the process-wide caches before any session needs them."""
+        for size in range(1, MAX_TABLE_RANGE + 1):
+            get_confusion_table(size)  # Also builds the fact deck
+        warm_glyph_cache(table_range)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 7007) -> int:
+        """Start listening, returns the bound port."""
+        self.warm_shared_caches()
+        self.base_rss = current_rss_bytes()
+        self.server = await asyncio.start_server(self._serve_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for app in list(self.sessions):
+            app.exit()
+        if self.uploader is not None:
+            self.uploader.close()
+        for history, _ in self._histories.values():
+            history.close()
+        self._histories.clear()
+
+    def _history_key(self, client: ClientConnection) -> Optional[str]:
+        if self.history_dir is None:
+            return None
+        if self.shared_history:
+            return SHARED_HISTORY_NAME
+        return f"{client.name}.db" if client.name is not None else None
+
+    def _acquire_history(self, key: Optional[str]) -> Optional[HistoryStore]:
+        if key is None:
+            return None
+        entry = self._histories.get(key)
+        if entry is None:
+            entry = self._histories[key] = [HistoryStore(self.history_dir / key), 0]
+        entry[1] += 1
+        return entry[0]
+
+    async def _release_history(self, key: Optional[str]) -> None:
+        entry = self._histories.get(key) if key is not None else None
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._histories[key]
+            # Closing waits for the pending writes, off the shared event loop
+            await asyncio.get_running_loop().run_in_executor(None, entry[0].close)
+
+    @property
+    def memory_per_session(self) -> float:
+        """Bytes of resident memory per active session."""
+        if not self.sessions:
+            return 0.0
+        return max(current_rss_bytes() - self.base_rss, 0) / len(self.sessions)
+
+    @property
+    def sessions_per_gb(self) -> float:
+        per_session = self.memory_per_session
+        if per_session <= 0:
+            return 0.0
+        return 1024 ** 3 / per_session
+
+    def report(self) -> str:
+        return (
+            f"sessions={len(self.sessions)} rss={current_rss_bytes() / 1024 ** 2:.0f}MB "
+            f"per_session={self.memory_per_session / 1024 ** 2:.1f}MB "
+            f"sessions_per_gb={self.sessions_per_gb:.0f}"
+        )
+
+    def _log(self, message: str) -> None:
+        # Apps redirect sys.stdout and sys.stderr while they run
+        if self.log is not None:
+            print(message, file=self.log, flush=True)
+
+    async def _read_handshake(self, reader: asyncio.StreamReader):
+        """The terminal size and client name, or the defaults for a bad handshake."""
+        try:
+            line = await asyncio.wait_for(reader.readline(), 5)
+        except asyncio.TimeoutError:
+            return DEFAULT_SIZE, None
+        parts = line.split()
+        if len(parts) in (3, 4) and parts[0] == HANDSHAKE and parts[1].isdigit() and parts[2].isdigit():
+            name = None
+            if len(parts) == 4 and CLIENT_NAME.fullmatch(parts[3]):
+                name = parts[3].decode("ascii")
+            return (int(parts[1]), int(parts[2])), name
+        return DEFAULT_SIZE, None
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        over_budget = self.memory_limit is not None and current_rss_bytes() >= self.memory_limit
+        if len(self.sessions) >= self.max_sessions or over_budget:
+            writer.write(b"MultiPy host is full, try again later.\r\n")
+            await writer.drain()
+            writer.close()
+            return
+
+        size, name = await self._read_handshake(reader)
+        client = ClientConnection(reader, writer, size, name)
+        history_key = self._history_key(client)
+        app = HostedApp(
+            client,
+            history_path=None, history=self._acquire_history(history_key), event_log_dir=self.event_log_dir,
+            low_bandwidth=self.low_bandwidth, count_output=True, uploader=self.uploader,
+        )
+        self.sessions.add(app)
+        self.peak_sessions = max(self.peak_sessions, len(self.sessions))
+        self._log(f"connect: client={name or '-'} {self.report()}")
+        try:
+            await app.run_async()
+        finally:
+            self.sessions.discard(app)
+            writer.close()
+            await self._release_history(history_key)
+            self._log(f"disconnect: client={name or '-'} sent={app.output_counter.bytes / 1024:.0f}KB {self.report()}")
+
+def connect(address: str, name: str) -> int:
+    """Minimal terminal client: raw mode, then pipe keys and screen updates."""
+    import selectors
+    import socket
+    import termios
+    import tty
+
+    host, _, port = address.rpartition(":")
+    sock = socket.create_connection((host or "127.0.0.1", int(port)))
+    columns, rows = shutil.get_terminal_size()
+    sock.sendall(b"%s %d %d %s\n" % (HANDSHAKE, columns, rows, name.encode("ascii")))
+
+    stdin = sys.stdin.fileno()
+    stdout = sys.stdout.fileno()
+    attrs = termios.tcgetattr(stdin)
+    tty.setraw(stdin)
+    selector = selectors.DefaultSelector()
+    selector.register(stdin, selectors.EVENT_READ)
+    selector.register(sock, selectors.EVENT_READ)
+    try:
+        while True:
+            for key, _ in selector.select():
+                if key.fileobj is sock:
+                    data = sock.recv(65536)
+                    if not data:
+                        return 0
+                    os.write(stdout, data)
+                else:
+                    sock.sendall(os.read(stdin, 4096))
+    finally:
+        termios.tcsetattr(stdin, termios.TCSADRAIN, attrs)
+        sock.close()
+
+async def serve(args, uploader: Optional[ResultUploader] = None) -> None:
+    memory_limit = args.memory_limit_mb * 1024 ** 2 if args.memory_limit_mb else None
+    if args.low_bandwidth and not cap_frame_rate():
+        from textual.constants import MAX_FPS
+        print(f"Textual was imported before --low-bandwidth was seen, repaints stay at {MAX_FPS} per second. "
+              f"Start the host with serve.py, or set TEXTUAL_FPS={LOW_BANDWIDTH_FPS}.", file=sys.__stderr__)
+    if uploader is not None:
+        # Sends what earlier runs left queued
+        uploader.start()
+    host = SessionHost(
+        max_sessions=args.max_sessions, memory_limit=memory_limit,
+        history_dir=args.history_dir or DEFAULT, shared_history=args.shared_history,
+        low_bandwidth=args.low_bandwidth, uploader=uploader,
+    )
+    port = await host.start(args.host, args.port)
+    host._log(f"MultiPy host listening on {args.host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await host.stop()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve MultiPy sessions to many terminals from one process.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7007)
+    parser.add_argument("--max-sessions", type=int, default=100)
+    parser.add_argument("--memory-limit-mb", type=int, help="turn new clients away above this resident memory")
+    parser.add_argument("--low-bandwidth", action="store_true",
+                        help="fewer and smaller repaints for every session, for slow links")
+    parser.add_argument("--upload-url", metavar="URL",
+                        help="send finished sessions to this results server (token in MULTIPY_UPLOAD_TOKEN)")
+    parser.add_argument("--history-dir", help="folder for the history of each client (default: ~/.multipy/clients)")
+    parser.add_argument("--shared-history", action="store_true",
+                        help="one history for every client, their answers mix in the adaptive weights and statistics")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="connect to a running host instead of serving")
+    parser.add_argument("--name", default=None,
+                        help="with --connect, the name your history is kept under (default: your user name)")
+    args = parser.parse_args(argv)
+
+    if args.connect:
+        import getpass
+        name = args.name or getpass.getuser()
+        if not CLIENT_NAME.fullmatch(name.encode("ascii", "replace")):
+            parser.error("--name takes letters, digits, '.', '_' and '-', up to 64 characters")
+        return connect(args.connect, name)
+    uploader = None
+    if args.upload_url:
+        try:
+            uploader = ResultUploader(args.upload_url, token=os.environ.get("MULTIPY_UPLOAD_TOKEN"))
+        except ValueError as exc:
+            parser.error(str(exc))
+    try:
+        asyncio.run(serve(args, uploader))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
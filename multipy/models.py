@@ -1,5 +1,10 @@
+from array import array
 from dataclasses import dataclass, field
 from enum import Enum, auto
+from typing import NamedTuple, Optional
+
+# Largest table range the menu accepts
+MAX_TABLE_RANGE = 50
 
 class GameMode(Enum):
     SIMPLE = auto()
@@ -11,6 +16,61 @@ class Settings:
     max_questions: int = 10
     time_limit: int = 30
     game_mode: GameMode = GameMode.SIMPLE
+    # Pick facts by how badly they are known instead of uniformly
+    adaptive: bool = False
+    # Seconds per question before it counts as a mistake, 0 for no limit
+    question_time_limit: int = 0
+    # Problem pack file to draw problems from instead of the table range
+    pack_path: Optional[str] = None
+    # Normal mode: check the answer once it has as many digits as the result
+    auto_submit: bool = False
+
+class AnswerRecord(NamedTuple):
+    factor_a: int
+    factor_b: int
+    given: int
+    correct: bool
+    response_ns: int
+
+class AnswerLog:
+    """Every answer of a session, stored column-wise in compact arrays.
+
+    `given` is -1 for a question that ran out of time.
+    """
+
+    def __init__(self):
+        self.factors_a = array('H')
+        self.factors_b = array('H')
+        self.given = array('q')
+        self.correct = array('b')
+        self.response_ns = array('q')
+
+    def record(self, factor_a: int, factor_b: int, given: int, correct: bool, response_ns: int) -> None:
+        self.factors_a.append(factor_a)
+        self.factors_b.append(factor_b)
+        # Typed answers can be arbitrarily long, keep them within the column type
+        self.given.append(max(min(given, 2**63 - 1), -2**63))
+        self.correct.append(correct)
+        self.response_ns.append(response_ns)
+
+    def __len__(self) -> int:
+        return len(self.response_ns)
+
+    def __getitem__(self, index: int) -> AnswerRecord:
+        return AnswerRecord(
+            self.factors_a[index],
+            self.factors_b[index],
+            self.given[index],
+            bool(self.correct[index]),
+            self.response_ns[index],
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return f"AnswerLog({len(self)} answers)"
 
 @dataclass
 class SessionResults:
@@ -20,9 +80,35 @@ class SessionResults:
     elapsed_time: float = 0.0
     current_streak: int = 0
     best_streak: int = 0
+    answers: AnswerLog = field(default_factory=AnswerLog)
+    # Bytes written to the terminal during the session, when the app counts them
+    output_bytes: Optional[int] = None
     
     @property
     def cpm(self) -> float:
         if self.elapsed_time > 0:
             return (self.correct_answers / self.elapsed_time) * 60
         return 0.0
+
+@dataclass
+class TickStats:
+    """Cost of the periodic HUD refresh in PracticeView."""
+    ticks: int = 0
+    widget_updates: int = 0
+    total_ns: int = 0
+
+    def record(self, duration_ns: int) -> None:
+        self.ticks += 1
+        self.total_ns += duration_ns
+
+    @property
+    def mean_tick_ns(self) -> float:
+        if self.ticks > 0:
+            return self.total_ns / self.ticks
+        return 0.0
+
+    @property
+    def updates_per_tick(self) -> float:
+        if self.ticks > 0:
+            return self.widget_updates / self.ticks
+        return 0.0
@@ -0,0 +1,113 @@
+"""Build problem packs, fixed drills that can be picked in the menu.
+
+    python packs.py tables 7 8 --upto 12 --name "Sevens and eights"
+    python packs.py mistakes --days 7
+    python packs.py info ~/.multipy/packs/mistakes.mpk
+
+Packs are written to ~/.multipy/packs unless --output is given.
+"""
+import argparse
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from multipy.models import MAX_TABLE_RANGE
+from multipy.services.history import HistoryStore, default_history_path
+from multipy.services.problem_pack import (
+    PACK_SUFFIX,
+    PackInfo,
+    PackProblem,
+    default_pack_dir,
+    get_problem_pack,
+    write_pack,
+)
+
+# Columns of an answer export row, see ANSWER_EXPORT_COLUMNS
+FACTOR_A, FACTOR_B, CORRECT = 5, 6, 9
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "pack"
+
+def table_problems(tables, upto: int):
+    """Every fact of `tables` up to `upto`, in both orders, each once."""
+    facts = {}
+    for table in tables:
+        for other in range(1, upto + 1):
+            facts.setdefault((table, other), None)
+            facts.setdefault((other, table), None)
+    return [PackProblem(a, b) for a, b in facts]
+
+def mistake_problems(store: HistoryStore, since: float):
+    """Facts answered wrong since `since`, weighted by how often."""
+    mistakes = Counter()
+    for chunk in store.iter_answer_rows(since=since):
+        for row in chunk:
+            if not row[CORRECT]:
+                mistakes[row[FACTOR_A], row[FACTOR_B]] += 1
+    return [PackProblem(a, b, float(count)) for (a, b), count in sorted(mistakes.items())]
+
+def _factor(value: str) -> int:
+    factor = int(value)
+    if not 1 <= factor <= MAX_TABLE_RANGE:
+        raise argparse.ArgumentTypeError(f"must be between 1 and {MAX_TABLE_RANGE}")
+    return factor
+
+def _describe(info: PackInfo) -> str:
+    options = ", fixed options" if info.has_options else ""
+    return f"{info.name}: {info.count} problems up to {info.max_factor}×{info.max_factor}{options} ({info.path})"
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build MultiPy problem packs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    tables = commands.add_parser("tables", help="every fact of some tables")
+    tables.add_argument("tables", type=_factor, nargs="+", help="tables to include, e.g. 7 8")
+    tables.add_argument("--upto", type=_factor, default=10, help="largest other factor (default 10)")
+
+    mistakes = commands.add_parser("mistakes", help="facts answered wrong recently, weighted by how often")
+    mistakes.add_argument("--days", type=float, default=7, help="look back this many days (default 7)")
+    mistakes.add_argument("--history", default=str(default_history_path()), help="history database to read")
+
+    for command in (tables, mistakes):
+        command.add_argument("--name", help="name shown in the menu")
+        command.add_argument("--output", help=f"file to write (default: {default_pack_dir()}/<name>{PACK_SUFFIX})")
+
+    info = commands.add_parser("info", help="describe a pack")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "info":
+            pack = get_problem_pack(args.path)
+            print(_describe(PackInfo(pack.path, pack.name, len(pack), pack.max_factor, pack.options is not None)))
+            print(f"total weight {pack.total_weight:g}")
+            return 0
+
+        if args.command == "tables":
+            name = args.name or f"Tables {', '.join(map(str, args.tables))} up to {args.upto}"
+            problems = table_problems(args.tables, args.upto)
+        else:
+            if not Path(args.history).exists():
+                print(f"No history found at {args.history}", file=sys.stderr)
+                return 1
+            name = args.name or f"Mistakes of the last {args.days:g} days"
+            store = HistoryStore(args.history)
+            try:
+                problems = mistake_problems(store, time.time() - args.days * 86400)
+            finally:
+                store.close()
+            if not problems:
+                print("No mistakes in that period, nothing to practise", file=sys.stderr)
+                return 1
+
+        output = Path(args.output) if args.output else default_pack_dir() / f"{_slug(name)}{PACK_SUFFIX}"
+        print(f"Wrote {_describe(write_pack(output, name, problems))}", file=sys.stderr)
+    except (OSError, ValueError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
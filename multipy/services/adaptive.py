@@ -0,0 +1,132 @@
+import random
+from typing import Dict, List, Optional, Tuple
+
+from multipy.models import Settings
+from multipy.services.distractors import get_confusion_table
+from multipy.services.fact_deck import get_fact_deck
+from multipy.services.math_generator import MathProblem
+from multipy.services.profiling import profiled
+
+# Response time (seconds) we consider fluent recall
+TARGET_RESPONSE_S = 3.0
+# Slow answers add at most this many times SPEED_WEIGHT
+MAX_SPEED_FACTOR = 3.0
+SPEED_WEIGHT = 0.5
+# Keeps well known facts in rotation now and then
+MIN_WEIGHT = 0.05
+# Smoothing of the per-fact response time (exponential moving average)
+RESPONSE_ALPHA = 0.3
+
+class FenwickTree:
+    """Binary indexed tree over non-negative weights.
+
+    Updating a weight and drawing an index in proportion to its weight both
+    take O(log n).
+    """
+
+    def __init__(self, weights: List[float]):
+        self.size = len(weights)
+        self.weights = list(weights)
+        self.tree = [0.0] * (self.size + 1)
+        for i, weight in enumerate(weights, start=1):
+            self.tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+        self.top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    @property
+    def total(self) -> float:
+        total = 0.0
+        i = self.size
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def set(self, index: int, weight: float) -> None:
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def find(self, value: float) -> int:
+        """Index of the weight that covers `value` in [0, total)."""
+        pos = 0
+        bit = self.top_bit
+        while bit:
+            nxt = pos + bit
+            if nxt <= self.size and self.tree[nxt] <= value:
+                pos = nxt
+                value -= self.tree[nxt]
+            bit >>= 1
+        # Float rounding can walk past the last weight
+        return min(pos, self.size - 1)
+
+    def sample(self, rng) -> int:
+        return self.find(rng.random() * self.total)
+
+class FactStats:
+    __slots__ = ("attempts", "mistakes", "response_s")
+
+    def __init__(self, attempts: int = 0, mistakes: int = 0, response_s: float = TARGET_RESPONSE_S):
+        self.attempts = attempts
+        self.mistakes = mistakes
+        self.response_s = response_s
+
+    @property
+    def weight(self) -> float:
+        # Laplace smoothing, unseen facts start at an error rate of 0.5
+        error_rate = (self.mistakes + 1) / (self.attempts + 2)
+        speed = min(self.response_s / TARGET_RESPONSE_S, MAX_SPEED_FACTOR) * SPEED_WEIGHT
+        return max(error_rate + speed, MIN_WEIGHT)
+
+class AdaptiveScheduler:
+    """Picks the next fact in proportion to how badly it is known.
+
+    Each a×b fact of the table range is weighted by its smoothed error rate
+    and average response time. Weights live in a Fenwick tree, so both
+    recording an answer and picking the next fact are O(log n).
+
+    `history` maps (a, b) to (attempts, mistakes, mean response seconds), as
+    returned by `HistoryStore.fact_stats`.
+    """
+
+    def __init__(self, settings: Settings, history: Optional[Dict[Tuple[int, int], Tuple[int, int, float]]] = None,
+                 seed: Optional[int] = None):
+        self.table_range = settings.table_range
+        self.rng = random.Random(seed)
+        self.deck = get_fact_deck(self.table_range)
+        self.stats = [FactStats() for _ in range(len(self.deck))]
+        for (a, b), (attempts, mistakes, response_s) in (history or {}).items():
+            if a <= self.table_range and b <= self.table_range:
+                self.stats[self.deck.index_of(a, b)] = FactStats(attempts, mistakes, response_s)
+        self.tree = FenwickTree([stats.weight for stats in self.stats])
+        self.last_index = -1
+
+    def observe(self, factor_a: int, factor_b: int, correct: bool, response_ns: int) -> None:
+        index = self.deck.index_of(factor_a, factor_b)
+        stats = self.stats[index]
+        stats.attempts += 1
+        if not correct:
+            stats.mistakes += 1
+        stats.response_s += RESPONSE_ALPHA * (response_ns / 1e9 - stats.response_s)
+        self.tree.set(index, stats.weight)
+
+    @profiled("adaptive.next_problem")
+    def next_problem(self, simple_mode: bool = False) -> MathProblem:
+        index = self.tree.sample(self.rng)
+        if index == self.last_index and len(self.deck) > 1:
+            # One redraw is enough to make back-to-back repeats rare
+            index = self.tree.sample(self.rng)
+        self.last_index = index
+
+        a = int(self.deck.factors_a[index])
+        b = int(self.deck.factors_b[index])
+        problem = MathProblem(factor_a=a, factor_b=b, answer=a * b)
+        if simple_mode:
+            problem.options = [problem.answer, *get_confusion_table(self.table_range).pick(index, self.rng)]
+            self.rng.shuffle(problem.options)
+        return problem
@@ -0,0 +1,66 @@
+"""Low-bandwidth display mode, and a count of the bytes sent to the terminal.
+
+Over SSH on a weak link every repaint costs. In low-bandwidth mode
+(`run.py --low-bandwidth`, `serve.py --low-bandwidth`) the screen is
+repainted at most `LOW_BANDWIDTH_FPS` times a second, progress bars and the
+countdown move in coarse steps, and problems are shown as plain text until
+T switches to big text.
+
+`counting_driver` wraps a Textual driver so the app's `OutputCounter` sees
+every write, which gives the bytes per session shown on the summary.
+"""
+import os
+import sys
+from functools import lru_cache
+
+LOW_BANDWIDTH_FPS = 10
+# Progress bars move in steps of this many percent
+PROGRESS_STEP = 10
+# The countdown shows multiples of COUNTDOWN_STEP seconds until the last
+# COUNTDOWN_EXACT seconds
+COUNTDOWN_STEP = 5
+COUNTDOWN_EXACT = 10
+
+def cap_frame_rate(fps: int = LOW_BANDWIDTH_FPS) -> bool:
+    """Repaint at most `fps` times a second, by setting TEXTUAL_FPS.
+
+    Textual reads TEXTUAL_FPS once when it is imported, so call this before
+    importing it. Applies to the whole process, so a host caps all of its
+    sessions, and a TEXTUAL_FPS the user set wins. Returns False when the
+    frame rate Textual already uses is above `fps`.
+    """
+    os.environ.setdefault("TEXTUAL_FPS", str(fps))
+    constants = sys.modules.get("textual.constants")
+    return constants is None or constants.MAX_FPS <= fps
+
+def coarse_percent(percent: float) -> int:
+    return int(percent) // PROGRESS_STEP * PROGRESS_STEP
+
+def coarse_seconds(seconds: int) -> int:
+    if seconds <= COUNTDOWN_EXACT:
+        return seconds
+    return -(-seconds // COUNTDOWN_STEP) * COUNTDOWN_STEP
+
+class OutputCounter:
+    """Bytes and writes sent to the terminal by one app."""
+    __slots__ = ("bytes", "writes")
+
+    def __init__(self):
+        self.bytes = 0
+        self.writes = 0
+
+    def add(self, data: str) -> None:
+        self.bytes += len(data.encode("utf-8"))
+        self.writes += 1
+
+@lru_cache(maxsize=None)
+def counting_driver(driver_class):
+    """A subclass of `driver_class` that adds every write to `app.output_counter`."""
+
+    class CountingDriver(driver_class):
+        def write(self, data: str) -> None:
+            self._app.output_counter.add(data)
+            super().write(data)
+
+    CountingDriver.__name__ = f"Counting{driver_class.__name__}"
+    return CountingDriver
@@ -0,0 +1,104 @@
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, fall back to pure Python
+    np = None
+
+from multipy.services.fact_deck import get_fact_deck
+
+# Maximum number of wrong answers kept per fact
+DISTRACTOR_SLOTS = 8
+
+def plausible_wrong_answers(a: int, b: int, products: List[int]) -> List[int]:
+    """Wrong answers for a×b, most plausible first.
+
+    `products` is the sorted list of distinct products in the table range.
+    The result always holds at least two values.
+    """
+    answer = a * b
+    candidates = [
+        # Off by one on either factor
+        a * (b + 1), a * (b - 1), (a + 1) * b, (a - 1) * b,
+    ]
+
+    # Swapped digits, e.g. 56 -> 65 (skipped when it would start with a zero)
+    digits = str(answer)
+    if len(digits) > 1 and digits[-1] != '0':
+        candidates.append(int(digits[::-1]))
+
+    # Neighbouring entries of the table
+    pos = bisect_left(products, answer)
+    if pos > 0:
+        candidates.append(products[pos - 1])
+    if pos + 1 < len(products):
+        candidates.append(products[pos + 1])
+
+    # Close numbers always exist, so every fact gets at least two options
+    candidates.extend((answer + 1, answer + 2))
+
+    wrong = []
+    for value in candidates:
+        if value > 0 and value != answer and value not in wrong:
+            wrong.append(value)
+    return wrong[:DISTRACTOR_SLOTS]
+
+class ConfusionTable:
+    """Precomputed wrong answers for every fact of one table range.
+
+    Rows follow the `FactDeck` order of the same range. Each row holds up to
+    `DISTRACTOR_SLOTS` values, `counts` tells how many of them are in use.
+    Picking distractors is a couple of random draws into a row, so it always
+    takes the same time no matter how large the range is.
+    """
+
+    def __init__(self, table_range: int):
+        self.table_range = table_range
+        deck = get_fact_deck(table_range)
+        products = sorted({a * b for a in range(1, table_range + 1) for b in range(1, table_range + 1)})
+
+        self.counts = array('B')
+        self.values = array('i')
+        for a, b in zip(deck.factors_a, deck.factors_b):
+            wrong = plausible_wrong_answers(int(a), int(b), products)
+            self.counts.append(len(wrong))
+            self.values.extend(wrong + [0] * (DISTRACTOR_SLOTS - len(wrong)))
+
+        if np is not None:
+            self.counts = np.frombuffer(self.counts, dtype=np.uint8).astype(np.int64)
+            self.values = np.frombuffer(self.values, dtype=np.int32).reshape(-1, DISTRACTOR_SLOTS).copy()
+            self.counts.setflags(write=False)
+            self.values.setflags(write=False)
+
+    def pick(self, index: int, rng) -> Tuple[int, int]:
+        """Two distinct wrong answers for the fact at `index`, using a `random.Random`."""
+        count = int(self.counts[index])
+        first = rng.randrange(count)
+        second = rng.randrange(count - 1)
+        if second >= first:
+            second += 1
+        if np is not None:
+            row = self.values[index]
+            return int(row[first]), int(row[second])
+        start = index * DISTRACTOR_SLOTS
+        return self.values[start + first], self.values[start + second]
+
+    def pick_many(self, indices, rng):
+        """Vectorized `pick` for NumPy, returns an (n, 2) array of wrong answers."""
+        counts = self.counts[indices]
+        first = (rng.random(len(indices)) * counts).astype(np.int64)
+        second = (rng.random(len(indices)) * (counts - 1)).astype(np.int64)
+        second += second >= first
+        rows = self.values[indices]
+        return np.stack([
+            np.take_along_axis(rows, first[:, None], axis=1)[:, 0],
+            np.take_along_axis(rows, second[:, None], axis=1)[:, 0],
+        ], axis=1)
+
+@lru_cache(maxsize=None)
+def get_confusion_table(table_range: int) -> ConfusionTable:
+    """Return the process-wide confusion table for `table_range`, building it on first use."""
+    return ConfusionTable(table_range)
@@ -0,0 +1,206 @@
+"""Binary log of everything that happens in a practice session.
+
+A log file is a 16 byte header followed by fixed-width 24 byte records:
+
+    header  magic (6s) | version (H) | wall clock start in ns (q)
+    record  t_ns (q) | kind (H) | a (H) | b (H) | padding (2x) | value (q)
+
+`t_ns` is monotonic time since the session started. The meaning of a, b
+and value depends on the kind, see `EventKind`. Records are appended through
+a buffered file, and `EventLog` reads a file through mmap. Only the newest
+`MAX_EVENT_LOGS` logs of a folder are kept, the app prunes older ones on a
+worker thread (see `prune_event_logs`).
+"""
+import mmap
+import os
+import struct
+import time
+from array import array
+from datetime import datetime
+from enum import IntEnum
+from itertools import count
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from multipy.models import GameMode, Settings
+
+MAGIC = b"MPYEVT"
+VERSION = 1
+HEADER = struct.Struct("<6sHq")
+RECORD = struct.Struct("<qHHH2xq")
+WRITE_BUFFER = 64 * 1024
+# Options of a Simple mode problem are packed into value, 16 bits each
+OPTION_BITS = 16
+OPTION_MASK = (1 << OPTION_BITS) - 1
+# Logs kept per folder, older ones are deleted at startup and after each session
+MAX_EVENT_LOGS = 500
+LOG_SUFFIX = ".mpe"
+
+class EventKind(IntEnum):
+    # a=table_range, b=max_questions, value=packed settings (see pack_settings)
+    SESSION_START = 1
+    # a, b=factors, value=packed options in Simple mode, 0 otherwise
+    PROBLEM_SHOWN = 2
+    # The answer field changed after a key press, value=its number or -1 when empty
+    KEY_PRESSED = 3
+    # value=the submitted answer
+    ANSWER_SUBMITTED = 4
+    # a=0 for the session time limit, 1 for the per-question limit
+    TIMER_EXPIRED = 5
+    # a=1 when the session was aborted
+    SESSION_END = 6
+
+class Event(NamedTuple):
+    t_ns: int
+    kind: int
+    a: int
+    b: int
+    value: int
+
+def pack_settings(settings: Settings) -> int:
+    return (
+        settings.time_limit
+        | settings.question_time_limit << 16
+        | settings.game_mode.value << 32
+        | int(settings.adaptive) << 40
+        | int(settings.auto_submit) << 41
+    )
+
+def unpack_settings(table_range: int, max_questions: int, value: int) -> Settings:
+    return Settings(
+        table_range=table_range,
+        max_questions=max_questions,
+        time_limit=value & 0xFFFF,
+        question_time_limit=(value >> 16) & 0xFFFF,
+        game_mode=GameMode((value >> 32) & 0xFF),
+        adaptive=bool((value >> 40) & 1),
+        auto_submit=bool((value >> 41) & 1),
+    )
+
+def pack_options(options) -> int:
+    value = 0
+    for i, option in enumerate(options):
+        value |= (option & OPTION_MASK) << (i * OPTION_BITS)
+    return value
+
+def unpack_options(value: int, n: int = 3):
+    return [(value >> (i * OPTION_BITS)) & OPTION_MASK for i in range(n)]
+
+def default_event_log_dir() -> Path:
+    return Path.home() / ".multipy" / "events"
+
+def prune_event_logs(directory, keep: int = MAX_EVENT_LOGS) -> None:
+    """Delete all but the newest `keep` logs in `directory`.
+
+    Lists and sorts the whole folder, so keep it off the UI thread.
+    """
+    # Names start with the date and time, so they sort oldest first
+    try:
+        logs = sorted(Path(directory).glob(f"session-*{LOG_SUFFIX}"))
+    except OSError:
+        return
+    for path in logs[:max(len(logs) - keep, 0)]:
+        try:
+            path.unlink()
+        except OSError:
+            # Gone already, or pruned by another session of a shared folder
+            pass
+
+_file_numbers = count()
+
+class EventLogWriter:
+    """Appends events of one session to a new file in `directory`."""
+
+    def __init__(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        # Unique per process and session, several hosted sessions can share a folder
+        name = f"session-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{next(_file_numbers)}{LOG_SUFFIX}"
+        self.path = directory / name
+        self._file = open(self.path, "wb", buffering=WRITE_BUFFER)
+        self._file.write(HEADER.pack(MAGIC, VERSION, time.time_ns()))
+        self._start_ns = time.monotonic_ns()
+        # Bound once, this runs on every key press
+        self._pack = RECORD.pack
+        self._write = self._file.write
+
+    def log(self, kind: EventKind, a: int = 0, b: int = 0, value: int = 0) -> None:
+        """Append one event. `value` must fit in a signed 64-bit integer."""
+        self._write(self._pack(time.monotonic_ns() - self._start_ns, kind, a, b, value))
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+class EventLog:
+    """Read-only, memory-mapped view of one event log file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            self._map.close()
+            raise ValueError(f"{self.path} is not a MultiPy event log")
+        magic, version, self.started_at_ns = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{self.path} is not a MultiPy event log (version {VERSION})")
+        # A session that crashed can leave a partial record at the end
+        self._count = (len(self._map) - HEADER.size) // RECORD.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> Event:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("event index out of range")
+        return Event(*RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size))
+
+    def __iter__(self) -> Iterator[Event]:
+        end = HEADER.size + self._count * RECORD.size
+        view = memoryview(self._map)[HEADER.size:end]
+        try:
+            for fields in RECORD.iter_unpack(view):
+                yield Event(*fields)
+        finally:
+            view.release()
+
+    def as_array(self):
+        """All events as a NumPy structured array.
+
+        The array is a view of the mapped file, drop it before `close`.
+        """
+        # Imported here, the app records events without loading NumPy
+        import numpy as np
+
+        dtype = np.dtype([
+            ("t_ns", "<i8"), ("kind", "<u2"), ("a", "<u2"), ("b", "<u2"), ("pad", "V2"), ("value", "<i8"),
+        ])
+        return np.frombuffer(self._map, dtype=dtype, count=self._count, offset=HEADER.size)
+
+    def settings(self) -> Optional[Settings]:
+        for event in self:
+            if event.kind == EventKind.SESSION_START:
+                return unpack_settings(event.a, event.b, event.value)
+        return None
+
+    def problems(self):
+        """The problems in the order they were shown, as a `ProblemSequence`."""
+        from multipy.services.math_generator import ProblemSequence
+
+        factors_a, factors_b, options = array('i'), array('i'), array('i')
+        simple_mode = False
+        for event in self:
+            if event.kind == EventKind.PROBLEM_SHOWN:
+                factors_a.append(event.a)
+                factors_b.append(event.b)
+                if event.value:
+                    simple_mode = True
+                    options.extend(unpack_options(event.value))
+        return ProblemSequence(factors_a, factors_b, options if simple_mode else None)
+
+    def close(self) -> None:
+        self._map.close()
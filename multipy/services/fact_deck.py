@@ -0,0 +1,58 @@
+from array import array
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, fall back to pure Python
+    np = None
+
+class FactDeck:
+    """Every a×b fact for one table range, in a fixed row-major order.
+
+    Decks are immutable and shared by all sessions in the process (see
+    `get_fact_deck`), sessions only keep the indices they were dealt.
+    """
+
+    def __init__(self, table_range: int):
+        self.table_range = table_range
+        if np is not None:
+            factors = np.arange(1, table_range + 1, dtype=np.int32)
+            self.factors_a = np.repeat(factors, table_range)
+            self.factors_b = np.tile(factors, table_range)
+            self.factors_a.setflags(write=False)
+            self.factors_b.setflags(write=False)
+        else:
+            factors = range(1, table_range + 1)
+            self.factors_a = array('i', (a for a in factors for _ in factors))
+            self.factors_b = array('i', (b for _ in factors for b in factors))
+
+    def __len__(self) -> int:
+        return self.table_range * self.table_range
+
+    def index_of(self, a: int, b: int) -> int:
+        return (a - 1) * self.table_range + (b - 1)
+
+    def deal(self, n: int, rng):
+        """Deal `n` fact indices without replacement.
+
+        `rng` is a `numpy.random.Generator` or a `random.Random`, matching the
+        backend. When `n` is larger than the deck, the deck is reshuffled and
+        dealing continues, so repeats only happen once every fact was shown.
+        """
+        size = len(self)
+        if np is not None:
+            rounds = [rng.permutation(size) for _ in range(n // size)]
+            if n % size:
+                rounds.append(rng.choice(size, n % size, replace=False))
+            return np.concatenate(rounds) if rounds else np.empty(0, dtype=np.int64)
+
+        indices = []
+        for _ in range(n // size):
+            indices.extend(rng.sample(range(size), size))
+        indices.extend(rng.sample(range(size), n % size))
+        return indices
+
+@lru_cache(maxsize=None)
+def get_fact_deck(table_range: int) -> FactDeck:
+    """Return the process-wide deck for `table_range`, building it on first use."""
+    return FactDeck(table_range)
@@ -0,0 +1,422 @@
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from multipy.models import AnswerRecord, GameMode, SessionResults, Settings
+
+# Sessions written per transaction at most
+BATCH_SIZE = 64
+# Attempts at writing a batch before its sessions are dropped, waiting
+# WRITE_RETRY_DELAY * 2**n seconds after failure n
+WRITE_ATTEMPTS = 5
+WRITE_RETRY_DELAY = 0.1
+# How many recent sessions feed the per-fact statistics
+FACT_STATS_SESSIONS = 200
+# Rows fetched at a time when streaming the history out
+EXPORT_CHUNK_ROWS = 50_000
+
+# Columns of the rows yielded by `iter_session_rows` and `iter_answer_rows`.
+# finished_at is a Unix timestamp, given is None for a question that ran out of
+# time. table_range is None for a pack session, whose facts come from pack_path.
+SESSION_EXPORT_COLUMNS = (
+    "session_id", "finished_at", "table_range", "max_questions", "time_limit", "game_mode",
+    "total_questions", "correct_answers", "mistakes", "elapsed_time", "best_streak", "cpm",
+    "adaptive", "pack_path",
+)
+ANSWER_EXPORT_COLUMNS = (
+    "session_id", "finished_at", "table_range", "game_mode", "question",
+    "factor_a", "factor_b", "product", "given", "correct", "response_ms",
+    "adaptive", "pack_path",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    table_range INTEGER NOT NULL,
+    max_questions INTEGER NOT NULL,
+    time_limit INTEGER NOT NULL,
+    game_mode TEXT NOT NULL,
+    total_questions INTEGER NOT NULL,
+    correct_answers INTEGER NOT NULL,
+    mistakes INTEGER NOT NULL,
+    elapsed_time REAL NOT NULL,
+    best_streak INTEGER NOT NULL,
+    adaptive INTEGER NOT NULL DEFAULT 0,
+    pack_path TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_finished_at ON sessions (finished_at);
+CREATE TABLE IF NOT EXISTS answers (
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    seq INTEGER NOT NULL,
+    factor_a INTEGER NOT NULL,
+    factor_b INTEGER NOT NULL,
+    given INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    response_ns INTEGER NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fact_totals (
+    factor_a INTEGER NOT NULL,
+    factor_b INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    mistakes INTEGER NOT NULL,
+    total_response_ns INTEGER NOT NULL,
+    PRIMARY KEY (factor_a, factor_b)
+) WITHOUT ROWID;
+"""
+# PRAGMA user_version: 1 once fact_totals covers every stored answer,
+# 2 once sessions have the adaptive and pack_path columns
+SCHEMA_VERSION = 2
+
+def default_history_path() -> Path:
+    return Path.home() / ".multipy" / "history.db"
+
+@dataclass
+class StoredSession:
+    id: int
+    finished_at: float
+    settings: Settings
+    results: SessionResults
+
+class HistoryStore:
+    """Local SQLite (WAL mode) history of finished sessions.
+
+    `save` only puts the session on a queue. A background thread writes
+    queued sessions in batches, one transaction per batch, so the UI never
+    waits on the disk. Call `close` on exit to flush what is still queued.
+    Database errors never reach the caller: they are kept in `last_error`
+    and failed reads return nothing. A failed batch is retried with backoff
+    and only dropped after WRITE_ATTEMPTS failures, which is counted in
+    `dropped` and reported to `on_drop(sessions, error)` from the writer
+    thread. Reads use read-only connections and never change the file.
+    """
+
+    def __init__(self, path, on_drop: Optional[Callable[[int, Exception], None]] = None):
+        self.path = str(path)
+        self.on_drop = on_drop
+        self.last_error: Optional[Exception] = None
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._migrate(conn)
+        return conn
+
+    def _connect_readonly(self) -> sqlite3.Connection:
+        """A connection that cannot create, migrate or write the database."""
+        if self.path == ":memory:":
+            return self._connect()
+        return sqlite3.connect(f"{Path(self.path).resolve().as_uri()}?mode=ro", uri=True)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                # Histories from before fact_totals: sum up their answers once
+                conn.execute("DELETE FROM fact_totals")
+                conn.execute(
+                    "INSERT INTO fact_totals (factor_a, factor_b, attempts, mistakes, total_response_ns)"
+                    " SELECT factor_a, factor_b, COUNT(*), SUM(1 - correct), SUM(response_ns)"
+                    " FROM answers GROUP BY factor_a, factor_b"
+                )
+            if version < 2:
+                # Sessions saved before this did not record these settings
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+                if "adaptive" not in columns:
+                    conn.execute("ALTER TABLE sessions ADD COLUMN adaptive INTEGER NOT NULL DEFAULT 0")
+                if "pack_path" not in columns:
+                    conn.execute("ALTER TABLE sessions ADD COLUMN pack_path TEXT")
+            if version < SCHEMA_VERSION:
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def save(self, settings: Settings, results: SessionResults) -> None:
+        """Queue a finished session for writing. Returns immediately."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="multipy-history", daemon=True)
+                self._writer.start()
+        self._queue.put((time.time(), settings, results))
+
+    def flush(self) -> None:
+        """Block until every queued session has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def _write_loop(self) -> None:
+        # Connected on the first batch, and again after a failure, so a
+        # database that cannot be opened never stops the queue from draining
+        conn = None
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                while item is not None and len(batch) < BATCH_SIZE:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+
+                sessions = [entry for entry in batch if entry is not None]
+                try:
+                    failures = 0
+                    while sessions:
+                        try:
+                            if conn is None:
+                                conn = self._connect()
+                            self._write_batch(conn, sessions)
+                            break
+                        except (sqlite3.Error, OSError) as exc:
+                            # Often passing, such as a database locked by another process
+                            self.last_error = exc
+                            if conn is not None:
+                                conn.close()
+                                conn = None
+                            failures += 1
+                            if failures >= WRITE_ATTEMPTS:
+                                self.dropped += len(sessions)
+                                if self.on_drop is not None:
+                                    self.on_drop(len(sessions), exc)
+                                break
+                            time.sleep(WRITE_RETRY_DELAY * 2 ** (failures - 1))
+                finally:
+                    # flush() must return even for a dropped batch
+                    for _ in batch:
+                        self._queue.task_done()
+                if len(sessions) < len(batch):
+                    return
+        finally:
+            if conn is not None:
+                conn.close()
+
+    @staticmethod
+    def _write_batch(conn: sqlite3.Connection, sessions) -> None:
+        # Per-fact [attempts, mistakes, total_response_ns] added to fact_totals
+        totals: Dict[Tuple[int, int], List[int]] = {}
+        with conn:
+            for finished_at, settings, results in sessions:
+                cursor = conn.execute(
+                    "INSERT INTO sessions (finished_at, table_range, max_questions, time_limit, game_mode,"
+                    " total_questions, correct_answers, mistakes, elapsed_time, best_streak, adaptive, pack_path)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        finished_at, settings.table_range, settings.max_questions, settings.time_limit,
+                        settings.game_mode.name, results.total_questions, results.correct_answers,
+                        results.mistakes, results.elapsed_time, results.best_streak,
+                        int(settings.adaptive), str(settings.pack_path) if settings.pack_path else None,
+                    ),
+                )
+                session_id = cursor.lastrowid
+                answers = results.answers
+                conn.executemany(
+                    "INSERT INTO answers (session_id, seq, factor_a, factor_b, given, correct, response_ns)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    zip(
+                        [session_id] * len(answers), range(len(answers)),
+                        answers.factors_a, answers.factors_b, answers.given,
+                        answers.correct, answers.response_ns,
+                    ),
+                )
+                for a, b, correct, response_ns in zip(
+                    answers.factors_a, answers.factors_b, answers.correct, answers.response_ns,
+                ):
+                    fact = totals.setdefault((a, b), [0, 0, 0])
+                    fact[0] += 1
+                    fact[1] += not correct
+                    fact[2] += response_ns
+            conn.executemany(
+                "INSERT INTO fact_totals (factor_a, factor_b, attempts, mistakes, total_response_ns)"
+                " VALUES (?, ?, ?, ?, ?) ON CONFLICT (factor_a, factor_b) DO UPDATE SET"
+                " attempts = attempts + excluded.attempts, mistakes = mistakes + excluded.mistakes,"
+                " total_response_ns = total_response_ns + excluded.total_response_ns",
+                [(a, b, *fact) for (a, b), fact in totals.items()],
+            )
+
+    def _read(self, sql: str, params=()) -> List[tuple]:
+        """Rows of a query on the shared reader, or none when the database fails.
+
+        The history is a convenience, a broken database must not stop practice.
+        """
+        if self.path != ":memory:" and not Path(self.path).exists():
+            # Nothing saved yet
+            return []
+        try:
+            if self._reader is None:
+                self._reader = self._connect_readonly()
+            return self._reader.execute(sql, params).fetchall()
+        except (sqlite3.Error, OSError) as exc:
+            self.last_error = exc
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            return []
+
+    def _has_session_settings(self) -> bool:
+        """Whether sessions have the adaptive and pack_path columns.
+
+        Reads never migrate, so a history last written by an older version lacks them.
+        """
+        version = self._read("PRAGMA user_version")
+        return bool(version) and version[0][0] >= 2
+
+    def _session_columns(self) -> Tuple[str, str]:
+        """SQL for the table_range and for the adaptive, pack_path columns of session `s`."""
+        if self._has_session_settings():
+            # The range picked in the menu says nothing about a pack's facts
+            return "CASE WHEN s.pack_path IS NULL THEN s.table_range END", "s.adaptive, s.pack_path"
+        return "s.table_range", "0, NULL"
+
+    def recent_sessions(self, limit: int = 10) -> List[StoredSession]:
+        """The last `limit` sessions, newest first. Answers are not loaded."""
+        rows = self._read(
+            "SELECT id, finished_at, table_range, max_questions, time_limit, game_mode,"
+            f" total_questions, correct_answers, mistakes, elapsed_time, best_streak, {self._session_columns()[1]}"
+            " FROM sessions s ORDER BY finished_at DESC LIMIT ?",
+            (limit,),
+        )
+        return [
+            StoredSession(
+                id=row[0],
+                finished_at=row[1],
+                settings=Settings(
+                    table_range=row[2], max_questions=row[3], time_limit=row[4],
+                    game_mode=GameMode[row[5]], adaptive=bool(row[11]), pack_path=row[12],
+                ),
+                results=SessionResults(
+                    total_questions=row[6], correct_answers=row[7], mistakes=row[8],
+                    elapsed_time=row[9], best_streak=row[10],
+                ),
+            )
+            for row in rows
+        ]
+
+    def session_answers(self, session_id: int) -> List[AnswerRecord]:
+        rows = self._read(
+            "SELECT factor_a, factor_b, given, correct, response_ns FROM answers"
+            " WHERE session_id = ? ORDER BY seq",
+            (session_id,),
+        )
+        return [AnswerRecord(a, b, given, bool(correct), response_ns) for a, b, given, correct, response_ns in rows]
+
+    def fact_stats(self, table_range: int, sessions: Optional[int] = FACT_STATS_SESSIONS) -> Dict[Tuple[int, int], Tuple[int, int, float]]:
+        """Per-fact (attempts, mistakes, mean response seconds) over the last `sessions` sessions.
+
+        `sessions=None` covers every stored session, read from the running
+        totals instead of the answers, so it costs the same for any history size.
+        """
+        version = self._read("PRAGMA user_version")
+        # Totals of an older history are only summed up once it is written to
+        if sessions is None and version and version[0][0] >= 1:
+            rows = self._read(
+                "SELECT factor_a, factor_b, attempts, mistakes, total_response_ns * 1.0 / attempts"
+                " FROM fact_totals WHERE factor_a <= ? AND factor_b <= ? AND attempts > 0",
+                (table_range, table_range),
+            )
+            return {(a, b): (attempts, mistakes, mean_ns / 1e9) for a, b, attempts, mistakes, mean_ns in rows}
+        rows = self._read(
+            "SELECT factor_a, factor_b, COUNT(*), SUM(1 - correct), AVG(response_ns) FROM answers"
+            " WHERE session_id IN (SELECT id FROM sessions ORDER BY finished_at DESC LIMIT ?)"
+            " AND factor_a <= ? AND factor_b <= ?"
+            " GROUP BY factor_a, factor_b",
+            # A negative LIMIT is no limit in SQLite
+            (-1 if sessions is None else sessions, table_range, table_range),
+        )
+        return {(a, b): (attempts, mistakes, mean_ns / 1e9) for a, b, attempts, mistakes, mean_ns in rows}
+
+    def iter_session_rows(self, since: Optional[float] = None, until: Optional[float] = None,
+                          min_table: Optional[int] = None, max_table: Optional[int] = None,
+                          chunk_size: int = EXPORT_CHUNK_ROWS) -> Iterator[List[tuple]]:
+        """Sessions as lists of at most `chunk_size` rows, oldest first.
+
+        See `SESSION_EXPORT_COLUMNS`. `since` and `until` are Unix timestamps
+        (until is exclusive), `min_table` and `max_table` bound the table range
+        and so leave out pack sessions.
+        """
+        table_range, settings = self._session_columns()
+        where, params = self._session_filter(since, until, min_table, max_table, self._has_session_settings())
+        yield from self._iter_chunks(
+            f"SELECT id, finished_at, {table_range}, max_questions, time_limit, game_mode,"
+            " total_questions, correct_answers, mistakes, elapsed_time, best_streak,"
+            " CASE WHEN elapsed_time > 0 THEN correct_answers * 60.0 / elapsed_time ELSE 0.0 END,"
+            f" {settings} FROM sessions s{where} ORDER BY finished_at, id",
+            params, chunk_size,
+        )
+
+    def iter_answer_rows(self, since: Optional[float] = None, until: Optional[float] = None,
+                         min_table: Optional[int] = None, max_table: Optional[int] = None,
+                         chunk_size: int = EXPORT_CHUNK_ROWS) -> Iterator[List[tuple]]:
+        """Answers of the matching sessions as lists of at most `chunk_size` rows.
+
+        Takes the same filters as `iter_session_rows`, see `ANSWER_EXPORT_COLUMNS`.
+        """
+        table_range, settings = self._session_columns()
+        where, params = self._session_filter(since, until, min_table, max_table, self._has_session_settings())
+        yield from self._iter_chunks(
+            f"SELECT s.id, s.finished_at, {table_range}, s.game_mode, a.seq + 1,"
+            " a.factor_a, a.factor_b, a.factor_a * a.factor_b, NULLIF(a.given, -1), a.correct,"
+            f" a.response_ns / 1e6, {settings}"
+            f" FROM sessions s JOIN answers a ON a.session_id = s.id{where}"
+            " ORDER BY s.finished_at, s.id, a.seq",
+            params, chunk_size,
+        )
+
+    @staticmethod
+    def _session_filter(since, until, min_table, max_table, has_packs: bool = False):
+        clauses, params = [], []
+        if has_packs and (min_table is not None or max_table is not None):
+            # A pack session has no table range to match
+            clauses.append("s.pack_path IS NULL")
+        for clause, value in (
+            ("s.finished_at >= ?", since),
+            ("s.finished_at < ?", until),
+            ("s.table_range >= ?", min_table),
+            ("s.table_range <= ?", max_table),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return where, params
+
+    def _iter_chunks(self, sql: str, params, chunk_size: int) -> Iterator[List[tuple]]:
+        # A connection of its own, a long export must not hold the shared reader
+        conn = self._connect_readonly()
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            conn.close()
@@ -0,0 +1,120 @@
+from array import array
+from typing import List
+
+from multipy.models import MAX_TABLE_RANGE
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, fall back to pure Python
+    np = None
+
+# Colour steps of the heatmap, level 0 is worst and LEVELS - 1 best
+LEVELS = 10
+# Mean response times (seconds) mapped to the best and the worst speed level
+FAST_RESPONSE_S = 1.0
+SLOW_RESPONSE_S = 6.0
+
+class MasteryMatrix:
+    """Attempts, mistakes and response time for every a×b fact.
+
+    The counts live in dense MAX_TABLE_RANGE × MAX_TABLE_RANGE arrays, so
+    recording an answer is O(1) and any table range is a view of the same
+    matrix. `record` is called for every answer, `merge` adds a whole session.
+    """
+
+    def __init__(self, size: int = MAX_TABLE_RANGE):
+        self.size = size
+        if np is not None:
+            self.attempts = np.zeros((size, size), dtype=np.int32)
+            self.mistakes = np.zeros((size, size), dtype=np.int32)
+            self.total_ns = np.zeros((size, size), dtype=np.float64)
+        else:
+            # Flat row-major arrays
+            self.attempts = array('l', bytes(array('l').itemsize * size * size))
+            self.mistakes = array('l', self.attempts)
+            self.total_ns = array('d', bytes(array('d').itemsize * size * size))
+
+    def record(self, a: int, b: int, correct: bool, response_ns: int) -> None:
+        if not (1 <= a <= self.size and 1 <= b <= self.size):
+            return
+        if np is not None:
+            cell = (a - 1, b - 1)
+        else:
+            cell = (a - 1) * self.size + (b - 1)
+        self.attempts[cell] += 1
+        self.mistakes[cell] += not correct
+        self.total_ns[cell] += response_ns
+
+    def merge(self, other: "MasteryMatrix") -> None:
+        """Add the counts of `other`, a matrix of the same size."""
+        if np is not None:
+            self.attempts += other.attempts
+            self.mistakes += other.mistakes
+            self.total_ns += other.total_ns
+            return
+        for i in range(len(self.attempts)):
+            self.attempts[i] += other.attempts[i]
+            self.mistakes[i] += other.mistakes[i]
+            self.total_ns[i] += other.total_ns[i]
+
+    def load_stats(self, stats) -> None:
+        """Add `HistoryStore.fact_stats` output: {(a, b): (attempts, mistakes, mean seconds)}."""
+        for (a, b), (attempts, mistakes, mean_s) in stats.items():
+            if not (1 <= a <= self.size and 1 <= b <= self.size):
+                continue
+            cell = (a - 1, b - 1) if np is not None else (a - 1) * self.size + (b - 1)
+            self.attempts[cell] += attempts
+            self.mistakes[cell] += mistakes
+            self.total_ns[cell] += mean_s * 1e9 * attempts
+
+    @property
+    def total_attempts(self) -> int:
+        return int(sum(self.attempts) if np is None else self.attempts.sum())
+
+    def practised_range(self) -> int:
+        """Largest factor with at least one attempt, 0 when nothing was practised."""
+        if np is not None:
+            seen = np.flatnonzero(self.attempts.any(axis=0) | self.attempts.any(axis=1))
+            return int(seen[-1]) + 1 if len(seen) else 0
+        largest = 0
+        for i, attempts in enumerate(self.attempts):
+            if attempts:
+                largest = max(largest, i // self.size + 1, i % self.size + 1)
+        return largest
+
+    def levels(self, metric: str, table_range: int) -> List[List[int]]:
+        """Heatmap levels of the top-left `table_range` square, -1 where never attempted.
+
+        `metric` is "accuracy" or "speed". Level LEVELS - 1 is all correct or
+        as fast as FAST_RESPONSE_S.
+        """
+        n = min(table_range, self.size)
+        if np is not None:
+            attempts = self.attempts[:n, :n]
+            seen = attempts > 0
+            safe = np.maximum(attempts, 1)
+            if metric == "accuracy":
+                score = 1.0 - self.mistakes[:n, :n] / safe
+            else:
+                mean_s = self.total_ns[:n, :n] / safe / 1e9
+                score = (SLOW_RESPONSE_S - mean_s) / (SLOW_RESPONSE_S - FAST_RESPONSE_S)
+            levels = np.clip(score * (LEVELS - 1) + 0.5, 0, LEVELS - 1).astype(np.int8)
+            return np.where(seen, levels, -1).tolist()
+
+        rows = []
+        for a in range(n):
+            row = []
+            for b in range(n):
+                cell = a * self.size + b
+                attempts = self.attempts[cell]
+                if not attempts:
+                    row.append(-1)
+                    continue
+                if metric == "accuracy":
+                    score = 1.0 - self.mistakes[cell] / attempts
+                else:
+                    mean_s = self.total_ns[cell] / attempts / 1e9
+                    score = (SLOW_RESPONSE_S - mean_s) / (SLOW_RESPONSE_S - FAST_RESPONSE_S)
+                row.append(int(min(max(score * (LEVELS - 1) + 0.5, 0), LEVELS - 1)))
+            rows.append(row)
+        return rows
@@ -1,6 +1,24 @@
 import random
+from array import array
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, fall back to pure Python
+    np = None
+
+from multipy.models import Settings, GameMode
+from multipy.services.distractors import get_confusion_table
+from multipy.services.fact_deck import get_fact_deck
+from multipy.services.problem_pack import PACK_DISTRACTORS, ProblemPack, get_problem_pack
+from multipy.services.profiling import profiled
+
+# The six orderings of (answer, wrong_1, wrong_2) used to place the correct
+# answer at a random button position.
+OPTION_ORDERS: Tuple[Tuple[int, int, int], ...] = (
+    (0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1), (2, 1, 0),
+)
 
 @dataclass
 class MathProblem:
@@ -9,32 +27,159 @@ class MathProblem:
     answer: int
     options: List[int] = None  # For Simple Mode
 
+class ProblemSequence(Sequence):
+    """Compact, array-backed list of problems for a whole session.
+
+    Factors are stored in flat integer arrays (NumPy arrays when available,
+    `array.array` otherwise) and `MathProblem` objects are only built when a
+    problem is indexed.
+    """
+
+    def __init__(self, factors_a, factors_b, options=None):
+        self.factors_a = factors_a
+        self.factors_b = factors_b
+        # Flat array of len(self) * 3 option values, or None outside Simple mode
+        self.options = options
+
+    def __len__(self) -> int:
+        return len(self.factors_a)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("problem index out of range")
+
+        a = int(self.factors_a[index])
+        b = int(self.factors_b[index])
+        problem = MathProblem(factor_a=a, factor_b=b, answer=a * b)
+        if self.options is not None:
+            start = index * 3
+            problem.options = [int(opt) for opt in self.options[start:start + 3]]
+        return problem
+
 class MathGenerator:
     @staticmethod
+    @profiled("generate_problem")
     def generate_problem(table_range: int, simple_mode: bool = False) -> MathProblem:
         a = random.randint(1, table_range)
         b = random.randint(1, table_range)
-        # Ensure we don't just get 1x1 all the time, maybe weight it? 
-        # For now, simple random is fine based on specs.
         
         answer = a * b
         problem = MathProblem(factor_a=a, factor_b=b, answer=answer)
         
         if simple_mode:
-            options = {answer}
-            while len(options) < 3:
-                # Generate plausible wrong answers
-                offset = random.randint(-5, 5)
-                if offset == 0:
-                    continue
-                wrong_answer = answer + offset
-                if wrong_answer > 0:
-                    options.add(wrong_answer)
-                # Fallback purely random if plausible fails
-                if len(options) < 3:
-                     options.add(random.randint(1, table_range * table_range))
-                     
-            problem.options = list(options)
+            # Plausible wrong answers come from the precomputed confusion table
+            table = get_confusion_table(table_range)
+            index = get_fact_deck(table_range).index_of(a, b)
+            problem.options = [answer, *table.pick(index, random)]
             random.shuffle(problem.options)
             
         return problem
+
+    @staticmethod
+    @profiled("generate_session")
+    def generate_session(settings: Settings, n: int, seed: Optional[int] = None) -> ProblemSequence:
+        """Generate all `n` problems of a session in one pass.
+
+        Facts are dealt from the shared deck for `settings.table_range`
+        without replacement, so a session only repeats a fact once every
+        fact of the range has been asked.
+
+        With `settings.pack_path` set, problems are drawn from that problem
+        pack instead, see `generate_pack_session`.
+
+        Passing a `seed` makes the session reproducible. NumPy and the
+        pure-Python fallback use different random streams, so the same seed
+        only gives the same session on machines with the same backend.
+        """
+        simple_mode = settings.game_mode == GameMode.SIMPLE
+        if settings.pack_path:
+            return MathGenerator.generate_pack_session(get_problem_pack(settings.pack_path), n, simple_mode, seed)
+        if np is not None:
+            return MathGenerator._generate_session_numpy(settings.table_range, n, simple_mode, seed)
+        return MathGenerator._generate_session_python(settings.table_range, n, simple_mode, seed)
+
+    @staticmethod
+    def _generate_session_numpy(table_range: int, n: int, simple_mode: bool, seed: Optional[int]) -> ProblemSequence:
+        rng = np.random.default_rng(seed)
+        deck = get_fact_deck(table_range)
+        dealt = deck.deal(n, rng)
+        factors_a = deck.factors_a[dealt]
+        factors_b = deck.factors_b[dealt]
+        if not simple_mode:
+            return ProblemSequence(factors_a, factors_b)
+
+        answers = factors_a * factors_b
+        wrong = get_confusion_table(table_range).pick_many(dealt, rng)
+        candidates = np.concatenate([answers[:, None], wrong], axis=1).astype(np.int32)
+        orders = np.asarray(OPTION_ORDERS)[rng.integers(0, len(OPTION_ORDERS), size=n)]
+        options = np.take_along_axis(candidates, orders, axis=1).ravel()
+        return ProblemSequence(factors_a, factors_b, options)
+
+    @staticmethod
+    def _generate_session_python(table_range: int, n: int, simple_mode: bool, seed: Optional[int]) -> ProblemSequence:
+        rng = random.Random(seed)
+        deck = get_fact_deck(table_range)
+        dealt = deck.deal(n, rng)
+        factors_a = array('i', (deck.factors_a[i] for i in dealt))
+        factors_b = array('i', (deck.factors_b[i] for i in dealt))
+        if not simple_mode:
+            return ProblemSequence(factors_a, factors_b)
+
+        table = get_confusion_table(table_range)
+        options = array('i')
+        for index, a, b in zip(dealt, factors_a, factors_b):
+            candidates = [a * b, *table.pick(index, rng)]
+            options.extend(candidates[i] for i in rng.choice(OPTION_ORDERS))
+        return ProblemSequence(factors_a, factors_b, options)
+
+    @staticmethod
+    def generate_pack_session(pack: ProblemPack, n: int, simple_mode: bool, seed: Optional[int] = None) -> ProblemSequence:
+        """Draw `n` problems from a pack in proportion to their weights.
+
+        The pack's columns are read in place from the mapped file. In Simple
+        mode the pack's fixed wrong answers are used when it has them,
+        otherwise they come from the confusion table of its largest factor.
+        """
+        if np is not None:
+            rng = np.random.default_rng(seed)
+            cumulative = np.frombuffer(pack.cumulative_weights, dtype="<f8")
+            chosen = np.searchsorted(cumulative, rng.random(n) * cumulative[-1], side="right")
+            chosen = np.minimum(chosen, len(pack) - 1)
+            factors_a = np.frombuffer(pack.factors_a, dtype="<u2")[chosen].astype(np.int32)
+            factors_b = np.frombuffer(pack.factors_b, dtype="<u2")[chosen].astype(np.int32)
+            if not simple_mode:
+                return ProblemSequence(factors_a, factors_b)
+
+            if pack.options is not None:
+                wrong = np.frombuffer(pack.options, dtype="<u2").reshape(-1, PACK_DISTRACTORS)[chosen]
+            else:
+                size = pack.max_factor
+                wrong = get_confusion_table(size).pick_many((factors_a - 1) * size + (factors_b - 1), rng)
+            candidates = np.concatenate([(factors_a * factors_b)[:, None], wrong], axis=1).astype(np.int32)
+            orders = np.asarray(OPTION_ORDERS)[rng.integers(0, len(OPTION_ORDERS), size=n)]
+            options = np.take_along_axis(candidates, orders, axis=1).ravel()
+            return ProblemSequence(factors_a, factors_b, options)
+
+        rng = random.Random(seed)
+        chosen = [pack.sample(rng) for _ in range(n)]
+        factors_a = array('i', (pack.factors_a[i] for i in chosen))
+        factors_b = array('i', (pack.factors_b[i] for i in chosen))
+        if not simple_mode:
+            return ProblemSequence(factors_a, factors_b)
+
+        options = array('i')
+        table = get_confusion_table(pack.max_factor) if pack.options is None else None
+        deck = get_fact_deck(pack.max_factor)
+        for index, a, b in zip(chosen, factors_a, factors_b):
+            if table is None:
+                start = index * PACK_DISTRACTORS
+                wrong = pack.options[start:start + PACK_DISTRACTORS].tolist()
+            else:
+                wrong = table.pick(deck.index_of(a, b), rng)
+            candidates = [a * b, *wrong]
+            options.extend(candidates[i] for i in rng.choice(OPTION_ORDERS))
+        return ProblemSequence(factors_a, factors_b, options)
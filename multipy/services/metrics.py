@@ -1,17 +1,211 @@
+from array import array
+from typing import List, Optional, Tuple
+
 from multipy.models import SessionResults
 
+# Window of the rolling CPM, in buckets of PACE_BUCKET_S seconds
+PACE_WINDOW_S = 60
+PACE_BUCKET_S = 5
+# Median response times (seconds) that count as fluent and as slow recall
+FLUENT_RESPONSE_S = 3.0
+SLOW_RESPONSE_S = 6.0
+
+class RollingRate:
+    """Events per minute over the last `window_s` seconds.
+
+    Counts go into a fixed ring of buckets, so memory does not grow with the
+    number of events. Timestamps are seconds on a monotonic clock.
+    """
+
+    def __init__(self, start: float, window_s: int = PACE_WINDOW_S, bucket_s: int = PACE_BUCKET_S):
+        self.start = start
+        self.bucket_s = bucket_s
+        self.counts = array('l', [0] * (window_s // bucket_s))
+        self.last_bucket = 0
+
+    def _advance(self, now: float) -> int:
+        bucket = int((now - self.start) // self.bucket_s)
+        # Clear the buckets that fell out of the window since the last call
+        for stale in range(self.last_bucket + 1, min(bucket, self.last_bucket + len(self.counts)) + 1):
+            self.counts[stale % len(self.counts)] = 0
+        self.last_bucket = max(self.last_bucket, bucket)
+        return bucket
+
+    def add(self, now: float) -> None:
+        bucket = self._advance(now)
+        self.counts[bucket % len(self.counts)] += 1
+
+    def per_minute(self, now: float) -> float:
+        bucket = self._advance(now)
+        # From the start of the oldest bucket still counted, which early on
+        # is the start of the session
+        oldest = max(bucket - len(self.counts) + 1, 0)
+        span = now - self.start - oldest * self.bucket_s
+        if span <= 0:
+            return 0.0
+        return sum(self.counts) / span * 60
+
+class RunningMoments:
+    """Mean and variance in one pass (Welford's algorithm)."""
+
+    __slots__ = ("count", "mean", "_m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return self.variance ** 0.5
+
+class P2Quantile:
+    """Streaming estimate of one quantile with five markers (the P² algorithm).
+
+    Exact for the first five values, after that each value moves the markers
+    in O(1) time and memory.
+    """
+
+    def __init__(self, p: float):
+        self.p = p
+        self.heights: List[float] = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = (0, p / 2, p, (1 + p) / 2, 1)
+
+    @property
+    def count(self) -> int:
+        return self.positions[4] if len(self.heights) == 5 else len(self.heights)
+
+    def add(self, value: float) -> None:
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            k = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= heights[k + 1]:
+                k += 1
+        positions = self.positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            offset = self.desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> float:
+        if len(self.heights) < 5:
+            if not self.heights:
+                return 0.0
+            # Nearest rank, like MetricsService.response_time_percentile
+            index = min(max(int(round(self.p * len(self.heights))) - 1, 0), len(self.heights) - 1)
+            return self.heights[index]
+        return self.heights[2]
+
 class MetricsService:
+    """Live statistics of one session, plus helpers for finished sessions.
+
+    An instance is fed every answer through `observe` and keeps only
+    constant-size estimators: a rolling CPM, the mean and spread of the
+    response time and approximate p50/p90.
+    """
+
+    def __init__(self, start: float):
+        self.pace = RollingRate(start)
+        self.response_moments = RunningMoments()
+        self.response_p50 = P2Quantile(0.5)
+        self.response_p90 = P2Quantile(0.9)
+
+    def observe(self, correct: bool, response_ns: int, now: float) -> None:
+        seconds = response_ns / 1e9
+        self.response_moments.add(seconds)
+        self.response_p50.add(seconds)
+        self.response_p90.add(seconds)
+        if correct:
+            self.pace.add(now)
+
+    def rolling_cpm(self, now: float) -> float:
+        """Correct answers per minute over the last PACE_WINDOW_S seconds."""
+        return self.pace.per_minute(now)
+
+    @property
+    def median_response_s(self) -> float:
+        return self.response_p50.value
+
+    @property
+    def p90_response_s(self) -> float:
+        return self.response_p90.value
+
     @staticmethod
-    def get_feedback_message(results: SessionResults) -> str:
+    def get_feedback_message(results: SessionResults, metrics: Optional["MetricsService"] = None) -> str:
         accuracy = 0
         if results.total_questions > 0:
             accuracy = (results.correct_answers / results.total_questions) * 100
             
         if accuracy == 100:
-            return "Excellent! 🌟 Perfect Score!"
+            message = "Excellent! 🌟 Perfect Score!"
         elif accuracy >= 80:
-            return "Great Job! 🎉"
+            message = "Great Job! 🎉"
         elif accuracy >= 50:
             return "Good Effort! Keep practicing. 👍"
         else:
             return "Don't give up! Practice makes perfect. 💪"
+
+        # Speed only matters once the answers are right
+        if metrics is None or metrics.response_moments.count == 0:
+            return message
+        if metrics.median_response_s <= FLUENT_RESPONSE_S:
+            return message + "\nAnd fast, too! ⚡"
+        if metrics.median_response_s >= SLOW_RESPONSE_S:
+            return message + "\nNext step: answer a little faster. ⏱"
+        return message
+
+    @staticmethod
+    def response_time_percentile(results: SessionResults, pct: float) -> float:
+        """Response time in seconds at the given percentile (nearest rank)."""
+        times = sorted(results.answers.response_ns)
+        if not times:
+            return 0.0
+        index = min(max(int(round(pct / 100 * len(times))) - 1, 0), len(times) - 1)
+        return times[index] / 1e9
+
+    @staticmethod
+    def slowest_facts(results: SessionResults, count: int = 3) -> List[Tuple[int, int, float]]:
+        """The `count` slowest answered facts as (factor_a, factor_b, seconds)."""
+        slowest = sorted(results.answers, key=lambda record: record.response_ns, reverse=True)[:count]
+        return [(record.factor_a, record.factor_b, record.response_ns / 1e9) for record in slowest]
@@ -0,0 +1,248 @@
+"""Problem packs: fixed drills stored in a memory-mapped binary file.
+
+A pack file (.mpk) is a 64 byte header followed by little-endian columns:
+
+    header              magic (8s) | version (H) | flags (H) | count (I) |
+                        max_factor (H) | reserved (2x) | name (44s, UTF-8)
+    factors_a           uint16[count]
+    factors_b           uint16[count]
+    (padding to 8 bytes)
+    cumulative_weights  float64[count], running sum of the problem weights
+    options             uint16[count * 2], two wrong answers per problem,
+                        only when flags has HAS_OPTIONS
+
+Storing the running sum of the weights lets a problem be drawn by a binary
+search of the mapped column, so opening and sampling a pack never reads or
+copies the whole file.
+"""
+import atexit
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from multipy.models import MAX_TABLE_RANGE
+
+MAGIC = b"MPYPACK\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIH2x44s")
+HAS_OPTIONS = 1
+PACK_SUFFIX = ".mpk"
+# Wrong answers stored per problem when a pack has fixed options
+PACK_DISTRACTORS = 2
+# Packs kept mapped at once, the least recently used one is closed first
+MAX_OPEN_PACKS = 16
+
+def default_pack_dir() -> Path:
+    return Path.home() / ".multipy" / "packs"
+
+def _align8(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def _check_byteorder() -> None:
+    # The columns are used as native arrays without conversion
+    if sys.byteorder != "little":
+        raise RuntimeError("problem packs are little-endian and need a little-endian machine")
+
+class PackProblem(NamedTuple):
+    """One problem to write into a pack."""
+    factor_a: int
+    factor_b: int
+    weight: float = 1.0
+    # Two fixed wrong answers for Simple mode, or None to use the generated ones
+    distractors: Optional[Sequence[int]] = None
+
+class PackInfo(NamedTuple):
+    path: Path
+    name: str
+    count: int
+    max_factor: int
+    has_options: bool
+
+def _parse_header(data: bytes, path) -> PackInfo:
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a MultiPy problem pack")
+    magic, version, flags, count, max_factor, name = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a MultiPy problem pack (version {VERSION})")
+    return PackInfo(Path(path), name.rstrip(b"\0").decode("utf-8", "replace"), count, max_factor, bool(flags & HAS_OPTIONS))
+
+def read_pack_info(path) -> PackInfo:
+    """The header of a pack, without mapping the rest of the file."""
+    with open(path, "rb") as f:
+        return _parse_header(f.read(HEADER.size), path)
+
+def list_packs(directory=None) -> List[PackInfo]:
+    """Valid packs in `directory` (default: ~/.multipy/packs), sorted by name."""
+    directory = Path(directory) if directory is not None else default_pack_dir()
+    packs = []
+    for path in directory.glob(f"*{PACK_SUFFIX}"):
+        try:
+            packs.append(read_pack_info(path))
+        except (OSError, ValueError):
+            continue
+    return sorted(packs, key=lambda info: info.name.lower())
+
+class ProblemPack:
+    """A pack file mapped read-only. The columns are zero-copy memoryviews.
+
+    Packs are shared by every session in the process, see `get_problem_pack`.
+    """
+
+    def __init__(self, path):
+        _check_byteorder()
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            info = _parse_header(self._map[:HEADER.size], self.path)
+        except ValueError:
+            self._map.close()
+            raise
+        self.name = info.name
+        self.max_factor = info.max_factor
+        self.count = info.count
+
+        n = info.count
+        offset_b = HEADER.size + 2 * n
+        offset_weights = _align8(offset_b + 2 * n)
+        offset_options = offset_weights + 8 * n
+        end = offset_options + (4 * n if info.has_options else 0)
+        if len(self._map) < end or n == 0:
+            self._map.close()
+            raise ValueError(f"{self.path} is truncated or empty")
+
+        self._view = view = memoryview(self._map)
+        self.factors_a = view[HEADER.size:offset_b].cast("H")
+        self.factors_b = view[offset_b:offset_b + 2 * n].cast("H")
+        self.cumulative_weights = view[offset_weights:offset_options].cast("d")
+        # Flat, PACK_DISTRACTORS wrong answers per problem
+        self.options = view[offset_options:end].cast("H") if info.has_options else None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        """Unmap the file. The columns must not be used afterwards."""
+        for column in (self.factors_a, self.factors_b, self.cumulative_weights, self.options, self._view):
+            if column is not None:
+                column.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Something still holds a view of the columns, the map is
+            # closed when that is garbage collected
+            pass
+
+    @property
+    def total_weight(self) -> float:
+        return self.cumulative_weights[-1]
+
+    def sample(self, rng) -> int:
+        """Index of a problem drawn in proportion to its weight."""
+        index = bisect_right(self.cumulative_weights, rng.random() * self.total_weight)
+        return min(index, self.count - 1)
+
+def write_pack(path, name: str, problems: Iterable[PackProblem]) -> PackInfo:
+    """Write a pack file. Problems with a weight of 0 or less are skipped.
+
+    Either every problem has distractors or none has. The file is written
+    next to `path` and then moved in place, so a pack that sessions have
+    open is never seen half written.
+    """
+    _check_byteorder()
+    factors_a, factors_b = array("H"), array("H")
+    cumulative, options = array("d"), array("H")
+    total = 0.0
+    for problem in problems:
+        if problem.weight <= 0:
+            continue
+        if not (1 <= problem.factor_a <= MAX_TABLE_RANGE and 1 <= problem.factor_b <= MAX_TABLE_RANGE):
+            raise ValueError(f"factors must be between 1 and {MAX_TABLE_RANGE}: {problem.factor_a}×{problem.factor_b}")
+        factors_a.append(problem.factor_a)
+        factors_b.append(problem.factor_b)
+        total += problem.weight
+        cumulative.append(total)
+        if problem.distractors is not None:
+            wrong = list(problem.distractors[:PACK_DISTRACTORS])
+            answer = problem.factor_a * problem.factor_b
+            if len(set(wrong)) != PACK_DISTRACTORS or answer in wrong:
+                raise ValueError(f"{problem.factor_a}×{problem.factor_b} needs {PACK_DISTRACTORS} distinct wrong answers")
+            options.extend(wrong)
+    if not factors_a:
+        raise ValueError("a pack needs at least one problem")
+    has_options = len(options) > 0
+    if has_options and len(options) != PACK_DISTRACTORS * len(factors_a):
+        raise ValueError("either every problem or no problem must have distractors")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n = len(factors_a)
+    max_factor = max(max(factors_a), max(factors_b))
+    encoded_name = name.encode("utf-8")[:44]
+    header = HEADER.pack(MAGIC, VERSION, HAS_OPTIONS if has_options else 0, n, max_factor, encoded_name)
+    padding = _align8(HEADER.size + 4 * n) - (HEADER.size + 4 * n)
+
+    # A mapped file cannot be replaced on Windows
+    _close_pack(path.resolve())
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header)
+        for column in (factors_a, factors_b):
+            column.tofile(f)
+        f.write(b"\0" * padding)
+        cumulative.tofile(f)
+        if has_options:
+            options.tofile(f)
+    os.replace(tmp, path)
+    return PackInfo(path, name, n, max_factor, has_options)
+
+# Resolved path -> (mtime_ns, pack), least recently used first
+_open_packs: "OrderedDict[str, Tuple[int, ProblemPack]]" = OrderedDict()
+_open_packs_lock = threading.Lock()
+
+def get_problem_pack(path) -> ProblemPack:
+    """Return the process-wide pack for `path`, mapping it on first use.
+
+    A pack that was rewritten since it was opened is opened again, and the
+    old map is closed. Sessions copy what they draw from a pack, so closing
+    it never pulls the problems from under a running session.
+    """
+    path = Path(path).resolve()
+    mtime_ns = path.stat().st_mtime_ns
+    key = str(path)
+    with _open_packs_lock:
+        entry = _open_packs.get(key)
+        if entry is not None and entry[0] == mtime_ns:
+            _open_packs.move_to_end(key)
+            return entry[1]
+        pack = ProblemPack(path)
+        if entry is not None:
+            entry[1].close()
+        _open_packs[key] = (mtime_ns, pack)
+        _open_packs.move_to_end(key)
+        while len(_open_packs) > MAX_OPEN_PACKS:
+            _, (_, evicted) = _open_packs.popitem(last=False)
+            evicted.close()
+        return pack
+
+def _close_pack(path: Path) -> None:
+    with _open_packs_lock:
+        entry = _open_packs.pop(str(path), None)
+    if entry is not None:
+        entry[1].close()
+
+@atexit.register
+def close_packs() -> None:
+    """Unmap every open pack."""
+    with _open_packs_lock:
+        packs = [pack for _, pack in _open_packs.values()]
+        _open_packs.clear()
+    for pack in packs:
+        pack.close()
@@ -0,0 +1,156 @@
+"""Opt-in profiling: named timing spans, frame timing and cProfile.
+
+Profiling is on when the MULTIPY_PROFILE environment variable is set
+before multipy is imported (`run.py --profile` sets it):
+
+    MULTIPY_PROFILE=1      spans, frame timing, overlay and cProfile
+    MULTIPY_PROFILE=spans  spans, frame timing and overlay only
+
+When it is off, `profiled` returns the function unchanged, so the hooks
+cost nothing in normal runs.
+"""
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Optional
+
+MODE = os.environ.get("MULTIPY_PROFILE", "").strip().lower()
+ENABLED = MODE not in ("", "0", "off", "false")
+CPROFILE = ENABLED and MODE != "spans"
+# Lines of cProfile output in the report
+REPORT_FUNCTIONS = 40
+FRAME_SPAN = "frame"
+
+class SpanStats:
+    __slots__ = ("count", "total_ns", "max_ns", "last_ns")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.last_ns = 0
+
+    def add(self, duration_ns: int) -> None:
+        self.count += 1
+        self.total_ns += duration_ns
+        self.last_ns = duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.count if self.count else 0.0
+
+SPANS: Dict[str, SpanStats] = {}
+
+def record(name: str, duration_ns: int) -> None:
+    stats = SPANS.get(name)
+    if stats is None:
+        stats = SPANS[name] = SpanStats()
+    stats.add(duration_ns)
+
+def profiled(name: str):
+    """Decorator timing every call as span `name`, only when profiling is on."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter_ns() - start)
+        return wrapper
+    return decorate
+
+_installed = False
+# Whether frames are being timed, see install_frame_timing
+FRAME_TIMING = False
+
+def install_frame_timing() -> bool:
+    """Time every screen update (layout, compositing and output) as a frame.
+
+    Textual has no public hook around a repaint, so this wraps the private
+    method that does it. Textual versions without that method get no frame
+    timing, everything else is still profiled. Returns whether frames are timed.
+    """
+    global _installed, FRAME_TIMING
+    if not ENABLED or _installed:
+        return FRAME_TIMING
+    _installed = True
+    from textual.screen import Screen
+
+    update = getattr(Screen, "_on_timer_update", None)
+    if callable(update):
+        Screen._on_timer_update = profiled(FRAME_SPAN)(update)
+        FRAME_TIMING = True
+    return FRAME_TIMING
+
+class Session:
+    """Profiles the code run inside `with Session():` and writes a report on exit."""
+
+    def __init__(self, report_dir: Optional[Path] = None):
+        self.report_dir = Path(report_dir) if report_dir is not None else Path.home() / ".multipy" / "profiles"
+        self.profile = None
+        if CPROFILE:
+            import cProfile
+            self.profile = cProfile.Profile()
+        self.report_path: Optional[Path] = None
+        self.started = 0.0
+
+    def __enter__(self):
+        install_frame_timing()
+        self.started = time.perf_counter()
+        if self.profile is not None:
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profile is not None:
+            self.profile.disable()
+        self.report_path = self.write_report()
+        return False
+
+    def report(self) -> str:
+        import textual
+
+        lines = [
+            f"MultiPy profile, {datetime.now():%Y-%m-%d %H:%M:%S}",
+            f"Python {platform.python_version()} on {platform.platform()}, Textual {textual.__version__}, "
+            f"NumPy {'yes' if 'numpy' in sys.modules else 'not loaded'}",
+            f"Run time {time.perf_counter() - self.started:.1f}s, MULTIPY_PROFILE={MODE}"
+            + ("" if FRAME_TIMING else ", no frame timing with this Textual version"),
+            "",
+            f"{'span':<28}{'calls':>8}{'total ms':>11}{'mean us':>10}{'max us':>10}",
+        ]
+        for name, stats in sorted(SPANS.items(), key=lambda item: item[1].total_ns, reverse=True):
+            lines.append(
+                f"{name:<28}{stats.count:>8}{stats.total_ns / 1e6:>11.1f}"
+                f"{stats.mean_ns / 1e3:>10.1f}{stats.max_ns / 1e3:>10.1f}"
+            )
+        if self.profile is not None:
+            import io
+            import pstats
+
+            out = io.StringIO()
+            pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(REPORT_FUNCTIONS)
+            lines.extend(("", "cProfile, by cumulative time", out.getvalue()))
+        return "\n".join(lines) + "\n"
+
+    def write_report(self) -> Optional[Path]:
+        try:
+            self.report_dir.mkdir(parents=True, exist_ok=True)
+            path = self.report_dir / f"profile-{datetime.now():%Y%m%d-%H%M%S}.txt"
+            path.write_text(self.report(), encoding="utf-8")
+        except OSError:
+            return None
+        if self.profile is not None:
+            # Raw data as well, for snakeviz and friends
+            self.profile.dump_stats(str(path.with_suffix(".pstats")))
+        return path
@@ -0,0 +1,354 @@
+"""Upload finished sessions to a central results server.
+
+`enqueue` only puts the session on a queue. A background thread writes each
+session to a spool folder (~/.multipy/uploads) and sends the spooled
+sessions in batches, as one JSON POST per batch, over a single keep-alive
+HTTP connection:
+
+    POST <url>
+    {"sessions": [{"id": ..., "finished_at": ..., "settings": {...},
+                   "results": {...}, "answers": [[a, b, given, correct, response_ms], ...]}]}
+
+A session file is deleted once the server answered 2xx. Sessions are
+spooled by a thread of their own, so a slow or hung upload never keeps them
+off the disk, and `close` spools whatever is still queued. Sessions therefore
+survive the app exiting or crashing mid-upload and are sent on the next
+start. That makes delivery at-least-once: the server should ignore a session
+id it has already stored. Failed batches are retried with exponential
+backoff. After a 401 or 403 nothing is sent until the token changes
+(`set_token`, or the next start), and the spool is kept. Batches the server
+rejects with another 4xx are moved to the `rejected` subfolder instead of
+blocking the queue.
+"""
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from itertools import count
+from pathlib import Path
+from typing import Deque, List, Optional
+from urllib.parse import urlsplit
+
+from multipy.models import SessionResults, Settings
+
+# Sessions sent per request at most
+UPLOAD_BATCH = 50
+UPLOAD_TIMEOUT = 10.0
+# Backoff after a failed batch: BACKOFF_BASE * 2**failures, capped at BACKOFF_MAX
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 300.0
+# 4xx answers that mean "try again later" rather than "never send this"
+RETRY_STATUSES = {408, 425, 429}
+# 4xx answers about the token rather than the batch
+AUTH_STATUSES = {401, 403}
+SPOOL_SUFFIX = ".json"
+# Errors from reusing a connection the server already closed
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+def default_upload_dir() -> Path:
+    return Path.home() / ".multipy" / "uploads"
+
+def session_payload(session_id: str, finished_at: float, settings: Settings, results: SessionResults) -> dict:
+    answers = results.answers
+    return {
+        "id": session_id,
+        "finished_at": finished_at,
+        "settings": {
+            "table_range": settings.table_range,
+            "max_questions": settings.max_questions,
+            "time_limit": settings.time_limit,
+            "question_time_limit": settings.question_time_limit,
+            "game_mode": settings.game_mode.name,
+            "adaptive": settings.adaptive,
+            "pack": Path(settings.pack_path).stem if settings.pack_path else None,
+        },
+        "results": {
+            "total_questions": results.total_questions,
+            "correct_answers": results.correct_answers,
+            "mistakes": results.mistakes,
+            "elapsed_time": round(results.elapsed_time, 3),
+            "best_streak": results.best_streak,
+        },
+        "answers": [
+            [a, b, given if given >= 0 else None, bool(correct), round(response_ns / 1e6, 1)]
+            for a, b, given, correct, response_ns in zip(
+                answers.factors_a, answers.factors_b, answers.given, answers.correct, answers.response_ns,
+            )
+        ],
+    }
+
+_file_numbers = count()
+
+class ResultUploader:
+    """Queues finished sessions on disk and uploads them in the background.
+
+    Call `start` once to resume what an earlier run left in the spool, and
+    `close` on exit. One uploader can be shared by every app in a process.
+    """
+
+    def __init__(self, url: str, spool_dir=None, token: Optional[str] = None,
+                 batch_size: int = UPLOAD_BATCH, timeout: float = UPLOAD_TIMEOUT,
+                 backoff_base: float = BACKOFF_BASE, backoff_max: float = BACKOFF_MAX):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"not an http(s) URL: {url}")
+        self.url = url
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+        self._path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.spool_dir = Path(spool_dir) if spool_dir is not None else default_upload_dir()
+        self.token = token
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.sent = 0
+        self.batches = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._spooler: Optional[threading.Thread] = None
+        # Guards the threads, _backlog and _unspooled
+        self._lock = threading.Lock()
+        self._conn: Optional[http.client.HTTPConnection] = None
+        # Spooled files not confirmed yet, oldest first. Listed from the spool
+        # folder once when the spooler starts, then kept up to date in memory.
+        self._backlog: Deque[Path] = deque()
+        # Enqueued sessions not written to the spool yet
+        self._unspooled = 0
+        # Set once the spooler has listed what earlier runs left
+        self._listed = False
+        # Set after a 401 or 403, sending waits until the token differs from
+        # _refused_token
+        self._refused = False
+        self._refused_token: Optional[str] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None and not self._stopping:
+                self._spooler = threading.Thread(target=self._spool_loop, name="multipy-spooler", daemon=True)
+                self._spooler.start()
+                self._thread = threading.Thread(target=self._run, name="multipy-uploader", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, settings: Settings, results: SessionResults) -> None:
+        """Queue a finished session for upload. Returns immediately."""
+        with self._lock:
+            self._unspooled += 1
+            self._idle.clear()
+        self._queue.put((time.time(), settings, results))
+        self.start()
+        if self._stopping:
+            # Closed already, nothing else will write it out
+            self._spool_queued()
+
+    def set_token(self, token: Optional[str]) -> None:
+        """Use a new token, which resumes sending after a 401 or 403."""
+        self.token = token
+        self._wake.set()
+
+    def pending(self) -> int:
+        """Sessions not confirmed by the server yet, queued or spooled."""
+        with self._lock:
+            return self._unspooled + len(self._backlog)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued was uploaded. False on timeout."""
+        return self._idle.wait(timeout)
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Spool what is still queued and stop, without waiting for uploads.
+
+        A batch in flight after `timeout` is abandoned, it stays spooled.
+        """
+        with self._lock:
+            self._stopping = True
+            thread, self._thread = self._thread, None
+            spooler, self._spooler = self._spooler, None
+        self._wake.set()
+        if spooler is not None:
+            self._queue.put(None)
+            spooler.join(timeout)
+        # Whatever the spooler did not get to, including after a timeout
+        self._spool_queued()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _list_spool(self) -> List[Path]:
+        try:
+            return sorted(self.spool_dir.glob(f"*{SPOOL_SUFFIX}"))
+        except OSError:
+            return []
+
+    def _spool_loop(self) -> None:
+        # What earlier runs left comes first. Listed here, before anything
+        # new is spooled, so no file is listed and appended both.
+        listed = self._list_spool()
+        with self._lock:
+            self._backlog.extendleft(reversed(listed))
+            self._listed = True
+        self._wake.set()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._spool(*item)
+
+    def _spool_queued(self) -> None:
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                self._spool(*item)
+
+    def _spool(self, finished_at: float, settings: Settings, results: SessionResults) -> None:
+        # Sorts in the order the sessions finished
+        session_id = f"{time.time_ns():020d}-{os.getpid()}-{next(_file_numbers)}"
+        payload = session_payload(session_id, finished_at, settings, results)
+        path = None
+        try:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            path = self.spool_dir / f"{session_id}{SPOOL_SUFFIX}"
+            tmp = path.with_suffix(".part")
+            tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as exc:
+            path = None
+            self.last_error = f"spool: {exc}"
+        with self._lock:
+            self._unspooled -= 1
+            if path is not None:
+                self._backlog.append(path)
+        self._wake.set()
+
+    def _run(self) -> None:
+        try:
+            while not self._stopping:
+                with self._lock:
+                    batch = [self._backlog[i] for i in range(min(self.batch_size, len(self._backlog)))]
+                    if not batch and not self._unspooled and self._listed:
+                        self._idle.set()
+                if not batch or (self._refused and self.token == self._refused_token):
+                    self._wake.wait()
+                    self._wake.clear()
+                    continue
+                self._refused = False
+
+                try:
+                    status = self._send(batch)
+                except (OSError, http.client.HTTPException) as exc:
+                    self._drop_connection()
+                    self.last_error = f"{type(exc).__name__}: {exc}"
+                    self._backoff()
+                    continue
+
+                if 200 <= status < 300:
+                    self._finish(batch)
+                    self.sent += len(batch)
+                    self.batches += 1
+                    self.failures = 0
+                elif status >= 500 or status in RETRY_STATUSES:
+                    self.last_error = f"HTTP {status}"
+                    self._backoff()
+                elif status in AUTH_STATUSES:
+                    # Every batch would be refused the same way, keep them all
+                    self.last_error = f"HTTP {status}, paused until the upload token changes"
+                    self._refused, self._refused_token = True, self.token
+                else:
+                    self.last_error = f"HTTP {status}, batch moved to rejected"
+                    self._finish(batch, self.spool_dir / "rejected")
+                    self.rejected += len(batch)
+        finally:
+            self._drop_connection()
+
+    def _send(self, batch: List[Path]) -> int:
+        body = self._batch_body(batch)
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        reused = self._conn is not None
+        try:
+            return self._post(body, headers)
+        except STALE_CONNECTION_ERRORS:
+            if not reused:
+                raise
+            # The server closed the idle connection, one retry on a new one
+            self._drop_connection()
+            return self._post(body, headers)
+
+    def _post(self, body: bytes, headers) -> int:
+        if self._conn is None:
+            connection_class = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+            self._conn = connection_class(self._netloc, timeout=self.timeout)
+        self._conn.request("POST", self._path, body=body, headers=headers)
+        response = self._conn.getresponse()
+        # Read to the end, or the connection cannot be reused
+        response.read()
+        if response.will_close:
+            self._drop_connection()
+        return response.status
+
+    def _batch_body(self, batch: List[Path]) -> bytes:
+        sessions = []
+        for path in batch:
+            try:
+                sessions.append(path.read_bytes())
+            except OSError:
+                continue
+        # The spooled files are already JSON, join them instead of parsing
+        return b'{"sessions":[' + b",".join(sessions) + b"]}"
+
+    def _finish(self, batch: List[Path], move_to: Optional[Path] = None) -> None:
+        """Take a batch the server answered off the backlog, then delete or move its files.
+
+        A file that cannot be removed stays in the spool and is sent again
+        on the next start, which the server has to tolerate anyway.
+        """
+        with self._lock:
+            for _ in batch:
+                self._backlog.popleft()
+        try:
+            if move_to is not None:
+                move_to.mkdir(parents=True, exist_ok=True)
+            for path in batch:
+                try:
+                    if move_to is None:
+                        path.unlink()
+                    else:
+                        os.replace(path, move_to / path.name)
+                except FileNotFoundError:
+                    pass
+                except OSError as exc:
+                    self.last_error = f"spool: {exc}"
+        except OSError as exc:
+            self.last_error = f"spool: {exc}"
+
+    def _drop_connection(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _backoff(self) -> None:
+        """Wait before retrying, or until closed."""
+        self.failures += 1
+        delay = min(self.backoff_base * 2 ** (self.failures - 1), self.backoff_max)
+        # Jitter, so a classroom that lost the server does not retry in lockstep
+        deadline = time.monotonic() + delay * random.uniform(0.5, 1.0)
+        while not self._stopping:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._wake.wait(remaining)
+            self._wake.clear()
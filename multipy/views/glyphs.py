@@ -0,0 +1,50 @@
+from functools import lru_cache
+from typing import Tuple
+
+# Display styles for a problem
+BIG = "big"
+PLAIN = "plain"
+
+DIGITS = {
+    '0': ['███', '█ █', '█ █', '█ █', '███'],
+    '1': [' █ ', '██ ', ' █ ', ' █ ', '███'],
+    '2': ['███', '  █', '███', '█  ', '███'],
+    '3': ['███', '  █', '███', '  █', '███'],
+    '4': ['█ █', '█ █', '███', '  █', '  █'],
+    '5': ['███', '█  ', '███', '  █', '███'],
+    '6': ['███', '█  ', '███', '█ █', '███'],
+    '7': ['███', '  █', '  █', '  █', '  █'],
+    '8': ['███', '█ █', '███', '█ █', '███'],
+    '9': ['███', '█ █', '███', '  █', '███'],
+}
+
+TIMES_SYMBOL = ['   ', '   ', ' × ', '   ', '   ']
+
+# Enough for both styles of every fact at the largest table range
+PROBLEM_CACHE_SIZE = 2 * 50 * 50
+
+@lru_cache(maxsize=None)
+def big_text_lines(num: int) -> Tuple[str, ...]:
+    """The five ASCII art lines for a number, spaced one column per digit."""
+    glyphs = [DIGITS[char] for char in str(num) if char in DIGITS]
+    return tuple(' '.join(glyph[line_idx] for glyph in glyphs) for line_idx in range(5))
+
+@lru_cache(maxsize=PROBLEM_CACHE_SIZE)
+def render_problem(factor_a: int, factor_b: int, style: str = BIG) -> str:
+    """Render "a × b" in the given style. Results are cached process-wide."""
+    if style == BIG:
+        lines1 = big_text_lines(factor_a)
+        lines2 = big_text_lines(factor_b)
+        return '\n'.join(lines1[i] + TIMES_SYMBOL[i] + lines2[i] for i in range(5))
+    return f"{factor_a} × {factor_b}"
+
+def warm_glyph_cache(table_range: int) -> None:
+    """Render every fact of a table range in both styles ahead of time.
+
+    Facts that are already cached are just lookups, so warming the same
+    range again is cheap.
+    """
+    for a in range(1, table_range + 1):
+        for b in range(1, table_range + 1):
+            render_problem(a, b, BIG)
+            render_problem(a, b, PLAIN)
@@ -0,0 +1,104 @@
+from itertools import groupby
+from typing import Optional
+
+from rich.style import Style
+from rich.text import Text
+from textual.reactive import reactive
+from textual.widgets import Static
+
+from multipy.services.mastery import LEVELS, MasteryMatrix
+
+METRICS = ("accuracy", "speed")
+UNSEEN = "·"
+# Width of the row labels, followed by one space
+LABEL_WIDTH = 2
+
+def _level_style(level: int) -> Style:
+    # Red through yellow to green
+    fraction = level / (LEVELS - 1)
+    red = int(255 * min(1.0, 2 * (1 - fraction)))
+    green = int(200 * min(1.0, 2 * fraction))
+    return Style(color=f"rgb({red},{green},40)")
+
+LEVEL_STYLES = [_level_style(level) for level in range(LEVELS)]
+UNSEEN_STYLE = Style(dim=True)
+
+def cell_width(table_range: int) -> int:
+    """Characters per fact, so that ranges up to 50 fit in 54 columns."""
+    if table_range <= 12:
+        return 3
+    if table_range <= 25:
+        return 2
+    return 1
+
+class MasteryHeatmap(Static):
+    """A table_range × table_range grid coloured by accuracy or speed per fact.
+
+    Rows are the first factor, columns the second. Call `show` with a
+    `MasteryMatrix`, the grid is only rebuilt when it or the metric changes.
+    """
+
+    DEFAULT_CSS = """
+    MasteryHeatmap {
+        width: auto;
+        height: auto;
+    }
+    """
+
+    metric = reactive("accuracy", init=False)
+
+    def __init__(self, **kwargs):
+        super().__init__("", **kwargs)
+        self.matrix: Optional[MasteryMatrix] = None
+        self.table_range = 0
+
+    def show(self, matrix: MasteryMatrix, table_range: int) -> None:
+        self.matrix = matrix
+        self.table_range = table_range
+        self.update(self.render_grid())
+
+    def toggle_metric(self) -> None:
+        self.metric = METRICS[(METRICS.index(self.metric) + 1) % len(METRICS)]
+
+    def watch_metric(self, metric: str) -> None:
+        if self.matrix is not None:
+            self.update(self.render_grid())
+
+    def render_grid(self) -> Text:
+        n = self.table_range
+        width = cell_width(n)
+        levels = self.matrix.levels(self.metric, n)
+        block = "█" * (width - 1 if width > 1 else 1)
+        pad = " " if width > 1 else ""
+        dot = UNSEEN.center(width - 1) + pad if width > 1 else UNSEEN
+
+        grid = Text(no_wrap=True)
+        # Column numbers, every one when they fit, otherwise every 5th or 10th
+        step = 1 if width == 3 else (5 if width == 2 else 10)
+        header = [" "] * (n * width)
+        for b in range(1, n + 1):
+            if b == 1 or b % step == 0:
+                label = str(b)
+                start = (b - 1) * width
+                header[start:start + len(label)] = label
+        grid.append(" " * (LABEL_WIDTH + 1) + "".join(header).rstrip() + "\n", style=UNSEEN_STYLE)
+
+        for a, row in enumerate(levels, start=1):
+            grid.append(f"{a:>{LABEL_WIDTH}} ", style=UNSEEN_STYLE)
+            # One span per run of equal cells keeps 2,500 cells cheap to build
+            for level, run in groupby(row):
+                count = sum(1 for _ in run)
+                if level < 0:
+                    grid.append(dot * count, style=UNSEEN_STYLE)
+                elif pad:
+                    grid.append((block + pad) * count, style=LEVEL_STYLES[level])
+                else:
+                    grid.append(block * count, style=LEVEL_STYLES[level])
+            grid.append("\n")
+
+        worst, best = ("0%", "100%") if self.metric == "accuracy" else ("slow", "fast")
+        grid.append(f"{self.metric.capitalize()}: {worst} ")
+        for style in LEVEL_STYLES:
+            grid.append("█", style=style)
+        grid.append(f" {best}  {UNSEEN} not practised", style=None)
+        return grid
@@ -2,12 +2,14 @@ from textual import on
 from textual.app import ComposeResult
 from textual.containers import Container, Vertical, Horizontal
 from textual.screen import Screen
-from textual.widgets import Header, Footer, Button, Static, Label, Select, Input
+from textual.widgets import Header, Footer, Button, Static, Label, Select, Input, Switch
 from textual.validation import Number
 
-from multipy.models import Settings, GameMode
-from multipy.views.practice_view import PracticeView
-from multipy.views.about_view import AboutView
+from multipy.models import MAX_TABLE_RANGE, Settings, GameMode
+from multipy.services.problem_pack import list_packs
+
+# Select value for practising the table range instead of a pack
+NO_PACK = ""
 
 class MenuView(Screen):
     CSS = """
@@ -51,7 +53,7 @@ class MenuView(Screen):
         margin-top: 1;
     }
     
-    #about-btn {
+    #stats-btn, #about-btn {
         width: 100%;
         margin-top: 1;
     }
@@ -71,7 +73,7 @@ class MenuView(Screen):
             # Simple inputs for settings
             with Horizontal(classes="setting-row"):
                 yield Label("Table Range:")
-                yield Input("10", id="range-input", validators=[Number(minimum=1, maximum=50)])
+                yield Input("10", id="range-input", validators=[Number(minimum=1, maximum=MAX_TABLE_RANGE)])
             
             with Horizontal(classes="setting-row"):
                 yield Label("Questions:")
@@ -81,6 +83,10 @@ class MenuView(Screen):
                 yield Label("Time (sec):")
                 yield Input("30", id="time-input", validators=[Number(minimum=5, maximum=300)])
                 
+            with Horizontal(classes="setting-row"):
+                yield Label("Per Question (s):")
+                yield Input("0", id="question-time-input", validators=[Number(minimum=0, maximum=300)])
+                
             with Horizontal(classes="setting-row"):
                 yield Label("Mode:")
                 yield Select.from_values(
@@ -89,27 +95,54 @@ class MenuView(Screen):
                     id="mode-select"
                 )
 
+            with Horizontal(classes="setting-row"):
+                yield Label("Adaptive:")
+                yield Switch(value=False, id="adaptive-switch")
+
+            with Horizontal(classes="setting-row"):
+                yield Label("Auto Submit:")
+                yield Switch(value=False, id="auto-submit-switch")
+
+            with Horizontal(classes="setting-row"):
+                yield Label("Problems:")
+                yield Select([("Table range", NO_PACK)], value=NO_PACK, allow_blank=False, id="pack-select")
+
             yield Button("Start Practice", id="start-btn", variant="success")
+            yield Button("Statistics", id="stats-btn", variant="primary")
             yield Button("About", id="about-btn", variant="primary")
             yield Button("Quit", id="quit-btn", variant="error")
         yield Footer()
 
+    def on_screen_resume(self):
+        # Packs built while the app runs show up when returning to the menu
+        pack_select = self.query_one("#pack-select", Select)
+        selected = pack_select.value
+        options = [("Table range", NO_PACK)] + [(info.name, str(info.path)) for info in list_packs()]
+        pack_select.set_options(options)
+        if any(value == selected for _, value in options):
+            pack_select.value = selected
+
     @on(Button.Pressed, "#start-btn")
     def on_start(self):
         # Validate and gather settings
         range_input = self.query_one("#range-input", Input)
         questions_input = self.query_one("#questions-input", Input)
         time_input = self.query_one("#time-input", Input)
+        question_time_input = self.query_one("#question-time-input", Input)
         mode_select = self.query_one("#mode-select", Select)
+        adaptive_switch = self.query_one("#adaptive-switch", Switch)
+        auto_submit_switch = self.query_one("#auto-submit-switch", Switch)
+        pack_select = self.query_one("#pack-select", Select)
         
         # Basic validation fallback
-        if not range_input.is_valid or not questions_input.is_valid or not time_input.is_valid:
+        if not all(inp.is_valid for inp in (range_input, questions_input, time_input, question_time_input)):
             self.notify("Invalid settings. Please check your inputs.", severity="error")
             return
 
         table_range = int(range_input.value)
         max_questions = int(questions_input.value)
         time_limit = int(time_input.value)
+        question_time_limit = int(question_time_input.value)
         
         mode_val = mode_select.value
         game_mode = GameMode.SIMPLE if "Simple" in str(mode_val) else GameMode.NORMAL
@@ -118,13 +151,25 @@ class MenuView(Screen):
             table_range=table_range,
             max_questions=max_questions,
             time_limit=time_limit,
-            game_mode=game_mode
+            game_mode=game_mode,
+            adaptive=adaptive_switch.value,
+            question_time_limit=question_time_limit,
+            pack_path=pack_select.value or None,
+            auto_submit=auto_submit_switch.value,
         )
         
-        self.app.push_screen(PracticeView(settings))
+        # The practice screen (and the generator, and NumPy) are only loaded
+        # on first use, so the menu is shown sooner
+        self.app.start_practice(settings)
+
+    @on(Button.Pressed, "#stats-btn")
+    def on_stats(self):
+        from multipy.views.stats_view import StatsView
+        self.app.push_screen(StatsView())
 
     @on(Button.Pressed, "#about-btn")
     def on_about(self):
+        from multipy.views.about_view import AboutView
         self.app.push_screen(AboutView())
 
     @on(Button.Pressed, "#quit-btn")
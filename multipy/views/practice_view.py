@@ -1,41 +1,60 @@
+import asyncio
+import math
 import time
+from collections import deque
+from typing import Deque, NamedTuple, Optional
+
 from textual import on, work
 from textual.app import ComposeResult
+from textual.binding import Binding
 from textual.containers import Container, Horizontal, Vertical
 from textual.screen import Screen
 from textual.widgets import Header, Footer, Static, Button, Input, Label, ProgressBar
-from textual.reactive import reactive
-
-from multipy.models import Settings, SessionResults, GameMode
-from multipy.services.math_generator import MathGenerator, MathProblem
-from multipy.views.summary_view import SummaryView
-
-def big_text(num: int) -> str:
-    """Convert a number to larger ASCII art style."""
-    digits = {
-        '0': ['███', '█ █', '█ █', '█ █', '███'],
-        '1': [' █ ', '██ ', ' █ ', ' █ ', '███'],
-        '2': ['███', '  █', '███', '█  ', '███'],
-        '3': ['███', '  █', '███', '  █', '███'],
-        '4': ['█ █', '█ █', '███', '  █', '  █'],
-        '5': ['███', '█  ', '███', '  █', '███'],
-        '6': ['███', '█  ', '███', '█ █', '███'],
-        '7': ['███', '  █', '  █', '  █', '  █'],
-        '8': ['███', '█ █', '███', '█ █', '███'],
-        '9': ['███', '█ █', '███', '  █', '███'],
-    }
-    
-    num_str = str(num)
-    lines = ['', '', '', '', '']
-    
-    for i, char in enumerate(num_str):
-        if char in digits:
-            for line_idx in range(5):
-                lines[line_idx] += digits[char][line_idx]
-                if i < len(num_str) - 1:  # Add spacing between digits
-                    lines[line_idx] += ' '
-    
-    return '\n'.join(lines)
+from textual.reactive import reactive, var
+
+from multipy.models import Settings, SessionResults, GameMode, TickStats
+from multipy.services.adaptive import AdaptiveScheduler
+from multipy.services.bandwidth import coarse_percent, coarse_seconds
+from multipy.services.event_log import EventKind, EventLog, EventLogWriter, pack_options, pack_settings
+from multipy.services.mastery import MasteryMatrix
+from multipy.services.metrics import MetricsService
+from multipy.services import profiling
+from multipy.services.profiling import profiled
+from multipy.services.math_generator import MathGenerator, MathProblem, ProblemSequence
+from multipy.views.glyphs import BIG, PLAIN, render_problem
+from multipy.views.profile_overlay import ProfileOverlay
+
+# Upcoming problems kept ready to show
+PREFETCH_DEPTH = 4
+# The queue is refilled once fewer problems than this are ready
+PREFETCH_LOW_WATER = PREFETCH_DEPTH // 2
+
+class PreparedProblem(NamedTuple):
+    """A problem with its display text rendered in both styles."""
+    problem: MathProblem
+    big: str
+    plain: str
+
+def prepare_problem(problem: MathProblem) -> PreparedProblem:
+    return PreparedProblem(
+        problem,
+        render_problem(problem.factor_a, problem.factor_b, BIG),
+        render_problem(problem.factor_a, problem.factor_b, PLAIN),
+    )
+
+class AnswerButton(Button):
+    """Answer button for Simple mode that carries the option it stands for."""
+
+    def __init__(self, **kwargs):
+        super().__init__("", variant="primary", classes="answer-btn", **kwargs)
+        self.value = 0
+
+    def set_option(self, value: int):
+        self.value = value
+        self.label = str(value)
+        # A new problem is a new button as far as the user is concerned, so a
+        # click that is still animating must not swallow the next one.
+        self.remove_class("-active")
 
 class PracticeView(Screen):
     CSS = """
@@ -161,19 +180,56 @@ class PracticeView(Screen):
         ("q", "quit", "Quit"),
         ("escape", "abort_practice", "Abort Practice"),
         ("t", "toggle_text_size", "Toggle Text Size"),
+        Binding("f9", "toggle_profile_overlay", "Profile", show=False),
     ]
     
-    time_left = reactive(0.0)
-    current_question_idx = reactive(1)
+    # HUD state. These are plain vars (no screen repaint), each watcher only
+    # touches the widget that shows the value when the value actually changes.
+    time_left = var(0.0)
+    seconds_left = var(0, init=False)
+    timer_percent = var(0, init=False)
+    current_question_idx = var(1, init=False)
+    correct_count = var(0, init=False)
+    mistake_count = var(0, init=False)
+    streak = var((0, 0), init=False)
     big_text_enabled = reactive(True)
     
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings = None):
         super().__init__()
-        self.settings = settings
+        self.settings = settings or Settings()
+        self._needs_start = True
         self.results = SessionResults()
         self.current_problem: MathProblem = None
+        self.prepared: Optional[PreparedProblem] = None
+        self.problems: ProblemSequence = None
+        # Prepared upcoming problems of `problems`, filled by `prefetch`
+        self._prefetched: Deque[PreparedProblem] = deque()
+        self._prefetch_next = 0
+        # Wakes the prefetch worker when the queue runs low
+        self._prefetch_wanted = asyncio.Event()
+        self.scheduler: AdaptiveScheduler = None
         self.timer_active = False
+        # Monotonic clock, immune to wall-clock changes
         self.start_time = 0.0
+        self.deadline = 0.0
+        self._session_timer = None
+        self._countdown_timer = None
+        self._question_timer = None
+        self.problem_shown_ns = 0
+        self.tick_stats = TickStats()
+        # Live pace and response time estimators, created when the clock starts
+        self.metrics: Optional[MetricsService] = None
+        # Recording of the current session, and the recording being replayed
+        self.event_log: Optional[EventLogWriter] = None
+        self.replay: Optional[EventLog] = None
+        # Start of the time from creating the screen to mounting it
+        self._created_ns = time.perf_counter_ns()
+        # Coarse HUD steps, see multipy.services.bandwidth
+        self.low_bandwidth = False
+        # Last text of the stats line and the problem, identical updates are skipped
+        self._stats_text = None
+        self._problem_text = None
+        self._output_start = 0
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -195,121 +251,335 @@ class PracticeView(Screen):
             yield Static("Ready?", id="problem-display", classes="problem-display")
             
             with Container(id="input-container"):
-                if self.settings.game_mode == GameMode.NORMAL:
-                    yield Input(placeholder="?", type="integer", id="answer-input")
-                else:
-                    # Placeholders for buttons, will be added dynamically or updated
-                    yield Horizontal(id="buttons-container")
+                # Both modes are composed, reset() shows the one in use
+                yield Input(placeholder="?", type="integer", id="answer-input")
+                # A fixed pool of buttons, relabelled for every problem
+                with Horizontal(id="buttons-container"):
+                    for i in range(3):
+                        yield AnswerButton(id=f"answer-btn-{i}")
             
             with Container(id="timer-container"):
                 yield Static("", id="timer-fill")
+
+        if profiling.ENABLED:
+            yield ProfileOverlay()
         
         yield Footer()
 
     def on_mount(self):
+        # Look the HUD widgets up once instead of on every tick
+        self._stats_info = self.query_one("#stats-info", Label)
+        self._timer_fill = self.query_one("#timer-fill", Static)
+        self._correct_bar = self.query_one("#correct-bar-fill", Static)
+        self._mistakes_bar = self.query_one("#mistakes-bar-fill", Static)
+        self._streak_label = self.query_one("#streak-label", Label)
+        self._answer_buttons = list(self.query(AnswerButton))
+        self._answer_input = self.query_one("#answer-input", Input)
+        self._problem_display = self.query_one("#problem-display", Static)
+        self._buttons_container = self.query_one("#buttons-container", Horizontal)
+        self.low_bandwidth = getattr(self.app, "low_bandwidth", False)
+        if self.low_bandwidth:
+            # A big problem is several hundred bytes per repaint, T still switches
+            self.big_text_enabled = False
+        if profiling.ENABLED:
+            profiling.record("practice.mount", time.perf_counter_ns() - self._created_ns)
+    
+    def reset(self, settings: Settings, replay: Optional[EventLog] = None):
+        """Prepare a new session. It starts when the screen is shown.
+
+        With a `replay` log the session asks the recorded problems and sets
+        no timers, whoever replays the log answers and expires them.
+        """
+        self.stop_timers()
+        self.stop_prefetch()
+        self.timer_active = False
+        self.settings = settings
+        self.replay = replay
+        self._needs_start = True
+
+    def on_screen_resume(self):
+        # Also called when the summary on top is dismissed, which must not
+        # start another session
+        if not self._needs_start:
+            return
+        self._needs_start = False
+        is_simple = self.settings.game_mode == GameMode.SIMPLE
+        self._answer_input.display = not is_simple
+        self._buttons_container.display = is_simple
         self.start_game()
     
+    @profiled("start_game")
     def start_game(self):
         self.results = SessionResults()
+        self.tick_stats = TickStats()
+        self.metrics = None
+        # Per-fact counts of this session, updated after every answer. A new
+        # matrix, the summary of the previous session may still hold the last
+        self.mastery = MasteryMatrix()
         self.current_question_idx = 1
         self.time_left = float(self.settings.time_limit)
+        self.seconds_left = self.settings.time_limit
+        self.timer_percent = 0
+        self.correct_count = 0
+        self.mistake_count = 0
+        self.streak = (0, 0)
+        self.refresh_hud()
+        if self.replay is not None:
+            self.scheduler = None
+            self.problems = self.replay.problems()
+        elif self.settings.adaptive and not self.settings.pack_path:
+            # Adaptive sessions pick each fact after seeing the previous answer
+            history = getattr(self.app, "history", None)
+            fact_stats = history.fact_stats(self.settings.table_range) if history is not None else None
+            self.scheduler = AdaptiveScheduler(self.settings, fact_stats)
+        else:
+            self.scheduler = None
+            # Build the whole session up front instead of one problem per answer
+            self.problems = MathGenerator.generate_session(self.settings, self.settings.max_questions)
+        self.stop_prefetch()
+        self.prefetch()
+        self._open_event_log()
         self.timer_active = True
-        self.start_time = time.time()
-        self.set_interval(0.1, self.update_timer)
+        self.start_time = time.monotonic()
+        self.metrics = MetricsService(self.start_time)
+        counter = getattr(self.app, "output_counter", None)
+        self._output_start = counter.bytes if counter is not None else 0
+        self.deadline = self.start_time + self.settings.time_limit
+        if self.replay is None:
+            # One timer for the end of the session, and one wake-up per
+            # displayed second for the countdown, instead of polling
+            self._session_timer = self.set_timer(self.settings.time_limit, self.on_time_up)
+            self._schedule_countdown()
         self.next_problem()
 
+    def _open_event_log(self):
+        self.event_log = None
+        log_dir = getattr(self.app, "event_log_dir", None)
+        if log_dir is None or self.replay is not None:
+            return
+        try:
+            self.event_log = EventLogWriter(log_dir)
+        except OSError:
+            # Recording is a debugging aid, never a reason not to practice
+            return
+        self.event_log.log(
+            EventKind.SESSION_START, self.settings.table_range, self.settings.max_questions,
+            pack_settings(self.settings),
+        )
+
+    def _close_event_log(self, aborted: bool = False):
+        if self.event_log is not None:
+            self.event_log.log(EventKind.SESSION_END, int(aborted))
+            self.event_log.close()
+            self.event_log = None
+            prune = getattr(self.app, "start_event_log_pruning", None)
+            if prune is not None:
+                prune()
+
+    def _schedule_countdown(self):
+        """Wake up just after the displayed number of seconds changes."""
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        self._countdown_timer = self.set_timer(remaining - math.floor(remaining) + 0.005, self.update_timer)
+
+    @profiled("update_timer")
     def update_timer(self):
         if not self.timer_active:
             return
-            
-        elapsed = time.time() - self.start_time
+        
+        tick_start = time.perf_counter_ns()
+        now = time.monotonic()
+        elapsed = min(now - self.start_time, self.settings.time_limit)
         self.results.elapsed_time = elapsed
         remaining = self.settings.time_limit - elapsed
         
-        if remaining <= 0:
-            remaining = 0
-            self.timer_active = False
-            self.end_game()
-        
         self.time_left = remaining
-        
-        # Update UI
-        time_percentage = (elapsed / self.settings.time_limit) * 100
-        timer_fill = self.query_one("#timer-fill", Static)
-        timer_fill.styles.width = f"{time_percentage}%"
-        
-        stats_info = self.query_one("#stats-info", Label)
-        stats_info.update(f"Question {self.current_question_idx}/{self.settings.max_questions} | Time: {int(remaining)}s")
-        
-        # Update progress bars
-        correct_percentage = (self.results.correct_answers / max(self.settings.max_questions, 1)) * 100
-        correct_bar = self.query_one("#correct-bar-fill", Static)
-        correct_bar.styles.width = f"{correct_percentage}%"
-        
-        mistakes_percentage = (self.results.mistakes / max(self.settings.max_questions, 1)) * 100
-        mistakes_bar = self.query_one("#mistakes-bar-fill", Static)
-        mistakes_bar.styles.width = f"{mistakes_percentage}%"
-        
-        # Update streak
-        streak_label = self.query_one("#streak-label", Label)
-        if self.results.current_streak > 0:
-            streak_text = f"🔥 Streak: {self.results.current_streak}"
-            if self.results.best_streak > self.results.current_streak:
-                streak_text += f" (Best: {self.results.best_streak})"
-            streak_label.update(streak_text)
+        seconds_left = math.ceil(remaining)
+        timer_percent = min(int((elapsed / self.settings.time_limit) * 100), 100)
+        if self.low_bandwidth:
+            # The vars only repaint when the coarse value changes
+            seconds_left = coarse_seconds(seconds_left)
+            timer_percent = coarse_percent(timer_percent)
+        self.seconds_left = seconds_left
+        self.timer_percent = timer_percent
+        self.tick_stats.record(time.perf_counter_ns() - tick_start)
+        self._schedule_countdown()
+
+    def on_time_up(self):
+        if not self.timer_active:
+            return
+        if self.event_log is not None:
+            self.event_log.log(EventKind.TIMER_EXPIRED, 0)
+        self.update_timer()
+        self.end_game()
+
+    def on_question_timeout(self):
+        if self.timer_active:
+            if self.event_log is not None:
+                self.event_log.log(EventKind.TIMER_EXPIRED, 1)
+            # Counts as a wrong answer
+            self.check_answer(None)
+
+    def stop_timers(self):
+        for timer in (self._session_timer, self._countdown_timer, self._question_timer):
+            if timer is not None:
+                timer.stop()
+        self._session_timer = self._countdown_timer = self._question_timer = None
+
+    @work(exclusive=True, group="prefetch")
+    async def prefetch(self):
+        """Prepare upcoming problems between messages, so moving on is a swap.
+
+        One worker per session: it fills the queue, then sleeps until
+        `next_problem` finds fewer than PREFETCH_LOW_WATER problems ready.
+        Adaptive sessions only know the next fact once the answer is in, so
+        for them the glyphs of the table range are rendered ahead instead.
+        """
+        if self.scheduler is not None:
+            for a in range(1, self.settings.table_range + 1):
+                for b in range(1, self.settings.table_range + 1):
+                    prepare_problem(MathProblem(a, b, a * b))
+                await asyncio.sleep(0)
+            return
+        while True:
+            while len(self._prefetched) < PREFETCH_DEPTH and self._prefetch_next < len(self.problems):
+                self._prefetched.append(prepare_problem(self.problems[self._prefetch_next]))
+                self._prefetch_next += 1
+                # Let input and repaints in between problems
+                await asyncio.sleep(0)
+            if self._prefetch_next >= len(self.problems):
+                return
+            self._prefetch_wanted.clear()
+            await self._prefetch_wanted.wait()
+
+    def stop_prefetch(self):
+        self.workers.cancel_group(self, "prefetch")
+        self._prefetched.clear()
+        self._prefetch_next = 0
+        self._prefetch_wanted.clear()
+
+    def _take_prepared(self, index: int) -> PreparedProblem:
+        """Problem `index` of the session, from the prefetch queue when it is ready."""
+        if self._prefetched and self._prefetch_next - len(self._prefetched) == index:
+            return self._prefetched.popleft()
+        # Not prefetched yet, the queue restarts after this problem
+        self._prefetched.clear()
+        self._prefetch_next = index + 1
+        return prepare_problem(self.problems[index])
+
+    def refresh_hud(self):
+        """Redraw every HUD widget, regardless of what changed."""
+        self._update_stats_info()
+        self.watch_timer_percent(self.timer_percent)
+        self.watch_correct_count(self.correct_count)
+        self.watch_mistake_count(self.mistake_count)
+        self.watch_streak(self.streak)
+
+    def _update_stats_info(self):
+        self.tick_stats.widget_updates += 1
+        stats = f"Question {self.current_question_idx}/{self.settings.max_questions} | Time: {self.seconds_left}s"
+        if self.metrics is not None:
+            stats += f" | Pace: {self.metrics.rolling_cpm(time.monotonic()):.0f} CPM"
+        if stats != self._stats_text:
+            self._stats_text = stats
+            self._stats_info.update(stats)
+
+    def watch_seconds_left(self, seconds_left: int):
+        self._update_stats_info()
+
+    def watch_current_question_idx(self, current_question_idx: int):
+        self._update_stats_info()
+
+    def watch_timer_percent(self, timer_percent: int):
+        self.tick_stats.widget_updates += 1
+        self._timer_fill.styles.width = f"{timer_percent}%"
+
+    def watch_correct_count(self, correct_count: int):
+        self.tick_stats.widget_updates += 1
+        correct_percentage = (correct_count / max(self.settings.max_questions, 1)) * 100
+        if self.low_bandwidth:
+            correct_percentage = coarse_percent(correct_percentage)
+        self._correct_bar.styles.width = f"{correct_percentage}%"
+
+    def watch_mistake_count(self, mistake_count: int):
+        self.tick_stats.widget_updates += 1
+        mistakes_percentage = (mistake_count / max(self.settings.max_questions, 1)) * 100
+        if self.low_bandwidth:
+            mistakes_percentage = coarse_percent(mistakes_percentage)
+        self._mistakes_bar.styles.width = f"{mistakes_percentage}%"
+
+    def watch_streak(self, streak):
+        self.tick_stats.widget_updates += 1
+        current_streak, best_streak = streak
+        if current_streak > 0:
+            streak_text = f"🔥 Streak: {current_streak}"
+            if best_streak > current_streak:
+                streak_text += f" (Best: {best_streak})"
+            self._streak_label.update(streak_text)
         else:
-            if self.results.best_streak > 0:
-                streak_label.update(f"Best Streak: {self.results.best_streak}")
+            if best_streak > 0:
+                self._streak_label.update(f"Best Streak: {best_streak}")
             else:
-                streak_label.update("")
+                self._streak_label.update("")
 
+    @profiled("next_problem")
     def next_problem(self):
         if self.current_question_idx > self.settings.max_questions:
             self.end_game()
             return
 
         is_simple = self.settings.game_mode == GameMode.SIMPLE
-        self.current_problem = MathGenerator.generate_problem(self.settings.table_range, simple_mode=is_simple)
-        
-        # Update Display
-        display = self.query_one("#problem-display", Static)
-        
-        if self.big_text_enabled:
-            # Big text mode with ASCII art
-            big_num1 = big_text(self.current_problem.factor_a)
-            big_num2 = big_text(self.current_problem.factor_b)
-            
-            # Create the multiplication symbol in ASCII art
-            times_symbol = ['   ', '   ', ' × ', '   ', '   ']
-            
-            # Combine the numbers with the multiplication symbol
-            lines1 = big_num1.split('\n')
-            lines2 = big_num2.split('\n')
-            combined = '\n'.join(lines1[i] + times_symbol[i] + lines2[i] for i in range(5))
-            
-            display.update(combined)
+        if self.scheduler is not None:
+            self.prepared = prepare_problem(self.scheduler.next_problem(simple_mode=is_simple))
         else:
-            # Normal text mode
-            display.update(f"{self.current_problem.factor_a} × {self.current_problem.factor_b}")
+            self.prepared = self._take_prepared(self.current_question_idx - 1)
+            if len(self._prefetched) < PREFETCH_LOW_WATER:
+                self._prefetch_wanted.set()
+        self.current_problem = self.prepared.problem
+        if self.event_log is not None:
+            problem = self.current_problem
+            self.event_log.log(
+                EventKind.PROBLEM_SHOWN, problem.factor_a, problem.factor_b,
+                pack_options(problem.options) if is_simple else 0,
+            )
+        
+        self.show_problem()
+        self.problem_shown_ns = time.monotonic_ns()
+        if self._question_timer is not None:
+            self._question_timer.stop()
+            self._question_timer = None
+        if self.settings.question_time_limit > 0 and self.replay is None:
+            self._question_timer = self.set_timer(self.settings.question_time_limit, self.on_question_timeout)
         
         if is_simple:
-            container = self.query_one("#buttons-container", Horizontal)
-            container.remove_children()
-            for opt in self.current_problem.options:
-                btn = Button(str(opt), variant="primary", classes="answer-btn")
-                # Store the value on the button logic
-                # We can't attach arbitrary data easily to button unless we subclass, 
-                # but we can parse the label.
-                container.mount(btn)
+            for btn, opt in zip(self._answer_buttons, self.current_problem.options):
+                btn.set_option(opt)
         else:
-            inp = self.query_one("#answer-input", Input)
-            inp.value = ""
-            inp.focus()
+            # Not a key press, must not be logged as one
+            with self._answer_input.prevent(Input.Changed):
+                self._answer_input.value = ""
+            self._answer_input.focus()
 
-    def check_answer(self, user_answer: int):
+    @profiled("check_answer")
+    def check_answer(self, user_answer: Optional[int]):
+        """Score an answer, `None` when the question timed out."""
+        if not self.timer_active:
+            # The session ended, its results are already on the summary
+            return
+        response_ns = time.monotonic_ns() - self.problem_shown_ns
         self.results.total_questions += 1
         
-        if user_answer == self.current_problem.answer:
+        is_correct = user_answer == self.current_problem.answer
+        self.results.answers.record(
+            self.current_problem.factor_a, self.current_problem.factor_b,
+            user_answer if user_answer is not None else -1, is_correct, response_ns,
+        )
+        self.mastery.record(self.current_problem.factor_a, self.current_problem.factor_b, is_correct, response_ns)
+        self.metrics.observe(is_correct, response_ns, time.monotonic())
+        if self.scheduler is not None:
+            self.scheduler.observe(self.current_problem.factor_a, self.current_problem.factor_b, is_correct, response_ns)
+        if is_correct:
             self.results.correct_answers += 1
             # Update streak
             self.results.current_streak += 1
@@ -322,44 +592,85 @@ class PracticeView(Screen):
             self.results.current_streak = 0
             # Visual feedback (flash red)
         
+        self.correct_count = self.results.correct_answers
+        self.mistake_count = self.results.mistakes
+        self.streak = (self.results.current_streak, self.results.best_streak)
         self.current_question_idx += 1
         self.next_problem()
 
+    @on(Input.Changed, "#answer-input")
+    def on_input_changed(self, event: Input.Changed):
+        if not self.timer_active:
+            return
+        if self.event_log is not None:
+            value = int(event.value) if event.value.isdigit() else -1
+            self.event_log.log(EventKind.KEY_PRESSED, value=min(value, 2**63 - 1))
+        # A replay submits where the log says, the recorded session already auto-submitted
+        if (
+            self.settings.auto_submit and self.replay is None
+            and event.value.isdigit()
+            # Keys typed faster than the messages are handled leave stale values behind
+            and event.value == self._answer_input.value
+            and len(event.value) == len(str(self.current_problem.answer))
+        ):
+            self.submit_typed_answer(event.value)
+
     @on(Input.Submitted, "#answer-input")
     def on_input_submitted(self, event: Input.Submitted):
-        if not event.value.isdigit():
-            return
-        self.check_answer(int(event.value))
+        # Enter still works with auto-submit, for answers of the wrong length
+        if self.timer_active and event.value.isdigit():
+            self.submit_typed_answer(event.value)
 
-    @on(Button.Pressed)
+    def submit_typed_answer(self, value: str):
+        answer = int(value)
+        if self.event_log is not None:
+            self.event_log.log(EventKind.ANSWER_SUBMITTED, value=min(answer, 2**63 - 1))
+        self.check_answer(answer)
+
+    @on(Button.Pressed, ".answer-btn")
     def on_button_pressed(self, event: Button.Pressed):
-        # Only handle answer buttons (which have numeric labels)
-        if event.button.label.plain.isdigit():
-            val = int(event.button.label.plain)
-            self.check_answer(val)
+        # A press queued before the session ended
+        if not self.timer_active:
+            return
+        if self.event_log is not None:
+            self.event_log.log(EventKind.ANSWER_SUBMITTED, value=event.button.value)
+        self.check_answer(event.button.value)
 
     def action_abort_practice(self):
         """Abort the current practice session and return to menu."""
         self.timer_active = False
+        self.stop_timers()
+        self.stop_prefetch()
+        self._close_event_log(aborted=True)
         self.app.pop_screen()
     
+    def action_toggle_profile_overlay(self):
+        for overlay in self.query(ProfileOverlay):
+            overlay.display = not overlay.display
+
     def action_toggle_text_size(self):
         """Toggle between big ASCII art text and normal text."""
         self.big_text_enabled = not self.big_text_enabled
         # Refresh the current problem display
         if self.current_problem:
-            display = self.query_one("#problem-display", Static)
-            if self.big_text_enabled:
-                big_num1 = big_text(self.current_problem.factor_a)
-                big_num2 = big_text(self.current_problem.factor_b)
-                times_symbol = ['   ', '   ', ' × ', '   ', '   ']
-                lines1 = big_num1.split('\n')
-                lines2 = big_num2.split('\n')
-                combined = '\n'.join(lines1[i] + times_symbol[i] + lines2[i] for i in range(5))
-                display.update(combined)
-            else:
-                display.update(f"{self.current_problem.factor_a} × {self.current_problem.factor_b}")
+            self.show_problem()
+
+    @profiled("show_problem")
+    def show_problem(self):
+        """Show the current problem in the selected text size."""
+        text = self.prepared.big if self.big_text_enabled else self.prepared.plain
+        # The same fact twice in a row needs no repaint
+        if text != self._problem_text:
+            self._problem_text = text
+            self._problem_display.update(text)
 
     def end_game(self):
         self.timer_active = False
-        self.app.push_screen(SummaryView(self.results))
+        self.results.elapsed_time = min(time.monotonic() - self.start_time, self.settings.time_limit)
+        counter = getattr(self.app, "output_counter", None)
+        if counter is not None:
+            self.results.output_bytes = counter.bytes - self._output_start
+        self.stop_timers()
+        self.stop_prefetch()
+        self._close_event_log()
+        self.app.show_summary(self.results, self.settings, self.mastery, self.metrics)
@@ -0,0 +1,41 @@
+from textual.widgets import Static
+
+from multipy.services import profiling
+
+# Refreshes per second, the overlay must not become the cost it measures
+OVERLAY_HZ = 2
+
+class ProfileOverlay(Static):
+    """One line with the last and worst frame time and the cost of the hot spans.
+
+    Only composed when profiling is on, see `multipy.services.profiling`.
+    """
+
+    DEFAULT_CSS = """
+    ProfileOverlay {
+        dock: bottom;
+        height: 1;
+        width: 100%;
+        background: $warning 30%;
+        color: $text;
+    }
+    """
+
+    SPANS = ("update_timer", "next_problem", "check_answer")
+
+    def on_mount(self) -> None:
+        self.set_interval(1 / OVERLAY_HZ, self.refresh_stats)
+
+    def refresh_stats(self) -> None:
+        # Hidden, or under another screen, a repaint would send bytes for nothing
+        if not self.display or not self.screen.is_current:
+            return
+        parts = []
+        frame = profiling.SPANS.get(profiling.FRAME_SPAN)
+        if frame is not None:
+            parts.append(f"frame {frame.last_ns / 1e6:.1f} ms (max {frame.max_ns / 1e6:.1f})")
+        for name in self.SPANS:
+            stats = profiling.SPANS.get(name)
+            if stats is not None:
+                parts.append(f"{name} {stats.mean_ns / 1e3:.0f} us")
+        self.update(" | ".join(parts) or "profiling")
@@ -0,0 +1,83 @@
+from textual import on
+from textual.app import ComposeResult
+from textual.containers import Container
+from textual.screen import Screen
+from textual.widgets import Header, Footer, Static, Button
+
+from multipy.views.heatmap import MasteryHeatmap
+
+class StatsView(Screen):
+    """Mastery of every fact over all stored sessions."""
+
+    CSS = """
+    StatsView {
+        align: center middle;
+    }
+
+    #stats-container {
+        width: 60;
+        height: auto;
+        max-height: 100%;
+        border: heavy $accent;
+        padding: 1 2;
+        background: $surface;
+        overflow-y: auto;
+    }
+
+    .title {
+        text-align: center;
+        text-style: bold;
+        color: $accent;
+        margin-bottom: 1;
+    }
+
+    #stats-summary {
+        text-align: center;
+        margin-bottom: 1;
+    }
+
+    #stats-heatmap {
+        margin-bottom: 1;
+    }
+
+    #metric-btn, #back-btn {
+        width: 100%;
+    }
+
+    #back-btn {
+        margin-top: 1;
+    }
+    """
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        with Container(id="stats-container"):
+            yield Static("Statistics", classes="title")
+            yield Static("", id="stats-summary")
+            yield MasteryHeatmap(id="stats-heatmap")
+            yield Button("Show Speed", id="metric-btn")
+            yield Button("Back to Menu", id="back-btn", variant="primary")
+        yield Footer()
+
+    def on_mount(self):
+        mastery = self.app.lifetime_mastery()
+        table_range = mastery.practised_range()
+        heatmap = self.query_one(MasteryHeatmap)
+        summary = self.query_one("#stats-summary", Static)
+        if table_range == 0:
+            summary.update("No sessions yet. Finish a session to see your progress here.")
+            heatmap.display = False
+            self.query_one("#metric-btn", Button).display = False
+            return
+        summary.update(f"{mastery.total_attempts} answers, facts up to {table_range} × {table_range}")
+        heatmap.show(mastery, table_range)
+
+    @on(Button.Pressed, "#metric-btn")
+    def toggle_metric(self, event: Button.Pressed):
+        heatmap = self.query_one(MasteryHeatmap)
+        heatmap.toggle_metric()
+        event.button.label = "Show Accuracy" if heatmap.metric == "speed" else "Show Speed"
+
+    @on(Button.Pressed, "#back-btn")
+    def go_back(self):
+        self.app.pop_screen()
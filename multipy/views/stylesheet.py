@@ -0,0 +1,32 @@
+from textual.cache import LRUCache
+from textual.css.stylesheet import Stylesheet
+
+# Parsed rule sets of every app in the process, keyed by CSS source and variables
+_shared_rules: LRUCache = LRUCache(256)
+
+class SharedStylesheet(Stylesheet):
+    """Stylesheet whose parsed rules are shared by every app in the process.
+
+    Textual parses the CSS of each app on its own and parses all of it again
+    whenever a screen adds new CSS. Parsed rule sets are never modified, so
+    apps with the same theme can reuse them: the CSS of each screen is parsed
+    once per process.
+    """
+
+    def _parse_rules(self, css, read_from, is_default_rules=False, tie_breaker=0, scope=""):
+        key = (tuple(sorted(self._variables.items())), css, read_from, is_default_rules, tie_breaker, scope)
+        try:
+            return _shared_rules[key]
+        except KeyError:
+            pass
+        rules = super()._parse_rules(css, read_from, is_default_rules, tie_breaker, scope)
+        _shared_rules[key] = rules
+        return rules
+
+    def reparse(self) -> None:
+        # The base class reparses into a fresh Stylesheet, which would bypass
+        # the shared cache. parse() only replaces the rules once every source
+        # parsed without errors, so parsing in place is just as safe.
+        self._require_parse = True
+        self._rules_map = None
+        self.parse()
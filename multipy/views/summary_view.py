@@ -4,8 +4,9 @@ from textual.containers import Container, Vertical
 from textual.screen import Screen
 from textual.widgets import Header, Footer, Static, Button
 
-from multipy.models import SessionResults
+from multipy.models import SessionResults, Settings
 from multipy.services.metrics import MetricsService
+from multipy.views.heatmap import MasteryHeatmap
 
 class SummaryView(Screen):
     CSS = """
@@ -16,6 +17,8 @@ class SummaryView(Screen):
     #summary-container {
         width: 60;
         height: auto;
+        max-height: 100%;
+        overflow-y: auto;
         border: heavy $accent;
         padding: 2;
         background: $surface;
@@ -41,39 +44,111 @@ class SummaryView(Screen):
         margin-bottom: 2;
     }
 
+    #summary-heatmap {
+        margin-bottom: 1;
+    }
+
+    #metric-btn {
+        width: 100%;
+    }
+
     #menu-btn {
         width: 100%;
         margin-top: 2;
     }
     """
 
-    def __init__(self, results: SessionResults):
+    def __init__(self, results: SessionResults = None, settings: Settings = None, mastery=None,
+                 metrics: MetricsService = None):
         super().__init__()
         self.results = results
+        self.settings = settings
+        self.mastery = mastery
+        self.metrics = metrics
+        self._needs_update = results is not None
+
+    def reset(self, results: SessionResults, settings: Settings = None, mastery=None,
+              metrics: MetricsService = None):
+        """Show a new session. The screen is installed once and reused."""
+        self.results = results
+        self.settings = settings
+        self.mastery = mastery
+        self.metrics = metrics
+        self._needs_update = True
 
     def compose(self) -> ComposeResult:
         yield Header()
         
-        feedback = MetricsService.get_feedback_message(self.results)
-        
         with Container(id="summary-container"):
             yield Static("Session Complete", classes="title")
-            
-            stats_text = (
-                f"Correct: {self.results.correct_answers}\n"
-                f"Mistakes: {self.results.mistakes}\n"
-                f"Time: {self.results.elapsed_time:.1f}s\n"
-                f"CPM: {self.results.cpm:.1f}\n"
-                f"🔥 Best Streak: {self.results.best_streak}"
-            )
-            yield Static(stats_text, classes="stats-row")
-            
-            yield Static(feedback, classes="feedback")
-            
+            yield Static("", id="stats-text", classes="stats-row")
+            yield Static("", id="timing-text", classes="stats-row")
+            yield Static("", id="feedback-text", classes="feedback")
+            yield MasteryHeatmap(id="summary-heatmap")
+            yield Button("Show Speed", id="metric-btn")
             yield Button("Return to Menu", id="menu-btn", variant="primary")
         
         yield Footer()
 
+    def on_screen_resume(self):
+        if not self._needs_update:
+            return
+        self._needs_update = False
+        self.show_results()
+
+        # Queued for a background write, this never waits on the disk
+        history = getattr(self.app, "history", None)
+        if history is not None and self.settings is not None:
+            history.save(self.settings, self.results)
+        uploader = getattr(self.app, "uploader", None)
+        if uploader is not None and self.settings is not None:
+            uploader.enqueue(self.settings, self.results)
+
+    def show_results(self):
+        stats_text = (
+            f"Correct: {self.results.correct_answers}\n"
+            f"Mistakes: {self.results.mistakes}\n"
+            f"Time: {self.results.elapsed_time:.1f}s\n"
+            f"CPM: {self.results.cpm:.1f}\n"
+            f"🔥 Best Streak: {self.results.best_streak}"
+        )
+        if self.results.output_bytes is not None:
+            stats_text += f"\nTerminal Output: {self.results.output_bytes / 1024:.1f} KB"
+        self.query_one("#stats-text", Static).update(stats_text)
+        
+        timing = self.query_one("#timing-text", Static)
+        timing.display = len(self.results.answers) > 0
+        if timing.display:
+            median = MetricsService.response_time_percentile(self.results, 50)
+            p90 = MetricsService.response_time_percentile(self.results, 90)
+            slowest = ", ".join(
+                f"{a} × {b} ({seconds:.1f}s)"
+                for a, b, seconds in MetricsService.slowest_facts(self.results)
+            )
+            timing.update(
+                f"Median Answer: {median:.1f}s | P90: {p90:.1f}s\n"
+                f"Slowest: {slowest}"
+            )
+        
+        self.query_one("#feedback-text", Static).update(MetricsService.get_feedback_message(self.results, self.metrics))
+
+        heatmap = self.query_one(MasteryHeatmap)
+        has_mastery = self.mastery is not None and self.settings is not None
+        heatmap.display = has_mastery
+        self.query_one("#metric-btn", Button).display = has_mastery
+        if has_mastery:
+            table_range = self.settings.table_range
+            if self.settings.pack_path:
+                # A pack's facts are not bound by the table range picked in the menu
+                table_range = self.mastery.practised_range() or table_range
+            heatmap.show(self.mastery, table_range)
+
+    @on(Button.Pressed, "#metric-btn")
+    def toggle_metric(self, event: Button.Pressed):
+        heatmap = self.query_one(MasteryHeatmap)
+        heatmap.toggle_metric()
+        event.button.label = "Show Accuracy" if heatmap.metric == "speed" else "Show Speed"
+
     @on(Button.Pressed, "#menu-btn")
     def return_to_menu(self):
         # We need to pop PracticeView as well.
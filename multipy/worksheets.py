@@ -0,0 +1,239 @@
+"""Print-ready drill worksheets with answer keys, generated in parallel.
+
+Every sheet is a seeded `MathGenerator.generate_session`, so sheet i of a
+run with `--seed S` is the same sheet every time (on the same backend, see
+`generate_session`). Sheets are rendered by a process pool in chunks and
+written to disk in order as chunks finish, with only a few chunks in
+memory at a time.
+
+    python worksheets.py sheets --count 2000 --problems 30 --table-range 12
+    python worksheets.py sheets --count 500 --mode simple --format pdf
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+from multipy.models import MAX_TABLE_RANGE, GameMode, Settings
+from multipy.services.math_generator import MathGenerator, ProblemSequence
+
+FORMATS = ("txt", "pdf")
+# Sheets rendered per task, large enough to hide the pool's overhead
+CHUNK_SHEETS = 50
+LINE_WIDTH = 78
+OPTION_LETTERS = "abc"
+# Between the answers on a line of an answer key
+KEY_SEPARATOR = "   "
+
+# Page layout of the PDF output (A4, Courier)
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 48
+FONT_SIZE = 10
+LEADING = 13
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+
+def render_sheet(number: int, settings: Settings, problems: ProblemSequence) -> Tuple[List[str], List[str]]:
+    """Lines of one worksheet and of its answer key."""
+    simple_mode = problems.options is not None
+    lines = [
+        f"MultiPy Worksheet #{number:04d}".ljust(LINE_WIDTH - 24) + "Name: _________________",
+        f"Tables 1-{settings.table_range}, {len(problems)} problems".ljust(LINE_WIDTH - 24) + "Date: _________________",
+        "",
+    ]
+    per_row = 2 if simple_mode else 3
+    cell_width = LINE_WIDTH // per_row
+    width = len(str(settings.table_range))
+    row = []
+    key = []
+    for i, problem in enumerate(problems, start=1):
+        question = f"{i:>2}) {problem.factor_a:>{width}} × {problem.factor_b:>{width}}"
+        if simple_mode:
+            choices = "  ".join(f"{letter}) {option}" for letter, option in zip(OPTION_LETTERS, problem.options))
+            row.append(f"{question}   {choices}".ljust(cell_width))
+            key.append(f"{i}) {OPTION_LETTERS[problem.options.index(problem.answer)]} {problem.answer}")
+        else:
+            row.append(f"{question} = ______".ljust(cell_width))
+            key.append(f"{i}) {problem.answer}")
+        if len(row) == per_row:
+            lines.extend(("".join(row).rstrip(), ""))
+            row = []
+    if row:
+        lines.append("".join(row).rstrip())
+
+    key_lines = [f"Worksheet #{number:04d}"]
+    current = ""
+    for entry in key:
+        if current and len(current) + len(KEY_SEPARATOR) + len(entry) > LINE_WIDTH:
+            key_lines.append(current)
+            current = ""
+        current = f"{current}{KEY_SEPARATOR}{entry}" if current else entry
+    key_lines.extend((current, ""))
+    return lines, key_lines
+
+def _paginate(lines: List[str]) -> List[List[str]]:
+    return [lines[start:start + LINES_PER_PAGE] for start in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+def _pdf_text(text: str) -> bytes:
+    encoded = text.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+def _page_stream(lines: List[str]) -> bytes:
+    """PDF content stream drawing `lines` top down."""
+    parts = [b"BT /F1 %d Tf %d TL %d %d Td" % (FONT_SIZE, LEADING, MARGIN, PAGE_HEIGHT - MARGIN)]
+    for line in lines:
+        parts.append(b"(" + _pdf_text(line) + b") '")
+    parts.append(b"ET")
+    return b"\n".join(parts)
+
+def _render_chunk(task) -> Tuple[list, list]:
+    """Worker: render sheets `first` to `first + count - 1`.
+
+    Returns the sheets and the keys as text (txt) or as page content
+    streams (pdf).
+    """
+    first, count, settings, seed, fmt = task
+    sheets, keys = [], []
+    for number in range(first, first + count):
+        problems = MathGenerator.generate_session(settings, settings.max_questions, seed=seed + number)
+        sheet_lines, key_lines = render_sheet(number, settings, problems)
+        if fmt == "pdf":
+            # Each sheet starts on a new page, keys run on
+            sheets.extend(_page_stream(page) for page in _paginate(sheet_lines))
+        else:
+            sheets.append("\n".join(sheet_lines) + "\n\f\n")
+        keys.extend(key_lines)
+    if fmt == "pdf":
+        return sheets, [_page_stream(page) for page in _paginate(keys)]
+    return sheets, ["\n".join(keys) + "\n"]
+
+class TextWriter:
+    def __init__(self, path: Path):
+        self.file = open(path, "w", encoding="utf-8", newline="\n")
+
+    def add(self, parts) -> None:
+        self.file.writelines(parts)
+
+    def close(self) -> None:
+        self.file.close()
+
+class PdfWriter:
+    """Writes pages as they come, the page tree and cross-reference table last.
+
+    Only the byte offset of every object is kept in memory.
+    """
+
+    def __init__(self, path: Path):
+        self.file = open(path, "wb")
+        self.offsets = []
+        self.page_ids = []
+        self.file.write(b"%PDF-1.4\n")
+        # Object 1 is the catalog and 2 the page tree, written in close()
+        self.offsets.extend((0, 0))
+        self.font_id = self._write_object(
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+
+    def _write_object(self, body: bytes, object_id: int = None) -> int:
+        if object_id is None:
+            self.offsets.append(0)
+            object_id = len(self.offsets)
+        self.offsets[object_id - 1] = self.file.tell()
+        self.file.write(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+        return object_id
+
+    def add(self, streams) -> None:
+        for stream in streams:
+            content_id = self._write_object(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+            self.page_ids.append(self._write_object(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R"
+                b" /Resources << /Font << /F1 %d 0 R >> >> >>"
+                % (PAGE_WIDTH, PAGE_HEIGHT, content_id, self.font_id)
+            ))
+
+    def close(self) -> None:
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self._write_object(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids)), 2)
+        self._write_object(b"<< /Type /Catalog /Pages 2 0 R >>", 1)
+        xref = self.file.tell()
+        self.file.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1))
+        self.file.writelines(b"%010d 00000 n \n" % offset for offset in self.offsets)
+        self.file.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(self.offsets) + 1, xref))
+        self.file.close()
+
+def generate_worksheets(directory, count: int, settings: Settings, seed: int = 0, fmt: str = "txt",
+                        workers: int = None, chunk_sheets: int = CHUNK_SHEETS) -> Tuple[Path, Path]:
+    """Write `count` worksheets and their answer keys into `directory`.
+
+    Returns the paths of the sheets and of the answer keys.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}, not {fmt!r}")
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    sheets_path = directory / f"worksheets.{fmt}"
+    keys_path = directory / f"answer_keys.{fmt}"
+    writer_class = PdfWriter if fmt == "pdf" else TextWriter
+    sheets_out, keys_out = writer_class(sheets_path), writer_class(keys_path)
+
+    workers = workers or os.cpu_count() or 1
+    tasks = (
+        (first, min(chunk_sheets, count + 1 - first), settings, seed, fmt)
+        for first in range(1, count + 1, chunk_sheets)
+    )
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # A few chunks per worker in flight, written in order as they finish
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.submit(_render_chunk, task))
+                if len(pending) >= 2 * workers:
+                    _write_chunk(pending.popleft().result(), sheets_out, keys_out)
+            while pending:
+                _write_chunk(pending.popleft().result(), sheets_out, keys_out)
+    finally:
+        sheets_out.close()
+        keys_out.close()
+    return sheets_path, keys_path
+
+def _write_chunk(result, sheets_out, keys_out) -> None:
+    sheets, keys = result
+    sheets_out.add(sheets)
+    keys_out.add(keys)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate printable MultiPy worksheets with answer keys.")
+    parser.add_argument("directory", help="folder to write worksheets and answer keys to")
+    parser.add_argument("--count", type=int, default=30, help="number of worksheets")
+    parser.add_argument("--problems", type=int, default=30, help="problems per worksheet")
+    parser.add_argument("--table-range", type=int, default=10)
+    parser.add_argument("--mode", choices=("normal", "simple"), default="normal",
+                        help="write-in answers (normal) or three choices (simple)")
+    parser.add_argument("--seed", type=int, default=0, help="sheet N uses seed + N")
+    parser.add_argument("--format", choices=FORMATS, default="txt")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    if not 1 <= args.table_range <= MAX_TABLE_RANGE:
+        parser.error(f"--table-range must be between 1 and {MAX_TABLE_RANGE}")
+    if args.count < 1 or args.problems < 1:
+        parser.error("--count and --problems must be at least 1")
+
+    settings = Settings(
+        table_range=args.table_range,
+        max_questions=args.problems,
+        game_mode=GameMode.SIMPLE if args.mode == "simple" else GameMode.NORMAL,
+    )
+    start = time.perf_counter()
+    sheets_path, keys_path = generate_worksheets(
+        args.directory, args.count, settings, seed=args.seed, fmt=args.format, workers=args.workers,
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {args.count} worksheets to {sheets_path} and answer keys to {keys_path}")
+    print(f"{elapsed:.2f}s, {args.count / elapsed:.0f} sheets/s with {args.workers or os.cpu_count()} workers")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
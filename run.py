@@ -1,5 +1,87 @@
-from multipy.app import MultiPyApp
+import time
+
+# Taken before anything else is imported, the origin of --startup-profile
+START_TIME = time.perf_counter()
+
+import argparse
+import os
+
+def main():
+    parser = argparse.ArgumentParser(description="MultiPy - Multiplication Practice")
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="start, draw the menu once, exit and report import time and time to first paint",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile the app (cProfile, timing spans and an overlay, F9 hides it) and write a report on exit",
+    )
+    parser.add_argument(
+        "--low-bandwidth",
+        action="store_true",
+        help="fewer and smaller repaints for slow links such as SSH or serial terminals",
+    )
+    parser.add_argument(
+        "--count-output",
+        action="store_true",
+        help="count the bytes written to the terminal, shown per session and on exit",
+    )
+    parser.add_argument(
+        "--upload-url",
+        metavar="URL",
+        help="also send finished sessions to this results server (token in MULTIPY_UPLOAD_TOKEN)",
+    )
+    args = parser.parse_args()
+    if args.profile:
+        # Read once when multipy is first imported
+        os.environ.setdefault("MULTIPY_PROFILE", "1")
+    if args.low_bandwidth:
+        # Read once when Textual is first imported
+        from multipy.services.bandwidth import cap_frame_rate
+        cap_frame_rate()
+
+    from multipy.app import MultiPyApp
+    from multipy.services import profiling
+    imported_time = time.perf_counter()
+
+    uploader = None
+    if args.upload_url:
+        from multipy.services.uploader import ResultUploader
+        try:
+            uploader = ResultUploader(args.upload_url, token=os.environ.get("MULTIPY_UPLOAD_TOKEN"))
+        except ValueError as exc:
+            parser.error(str(exc))
+        # Sends what earlier runs left queued
+        uploader.start()
+    app = MultiPyApp(
+        exit_after_first_paint=args.startup_profile,
+        low_bandwidth=args.low_bandwidth,
+        count_output=args.count_output,
+        uploader=uploader,
+    )
+    try:
+        if profiling.ENABLED:
+            with profiling.Session() as session:
+                app.run()
+            if session.report_path is not None:
+                print(f"Profile written to {session.report_path}")
+        else:
+            app.run()
+    finally:
+        if uploader is not None:
+            uploader.close()
+            if uploader.pending():
+                print(f"{uploader.pending()} sessions queued for upload, they are sent on the next start")
+
+    if app.output_counter is not None:
+        print(f"Terminal output: {app.output_counter.bytes} bytes in {app.output_counter.writes} writes")
+
+    if args.startup_profile:
+        print(f"Import time:         {(imported_time - START_TIME) * 1000:.0f} ms")
+        if app.first_paint_time is not None:
+            print(f"Time to first paint: {(app.first_paint_time - START_TIME) * 1000:.0f} ms")
 
 if __name__ == "__main__":
-    app = MultiPyApp()
-    app.run()
+    main()
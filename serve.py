@@ -0,0 +1,11 @@
+import sys
+
+if "--low-bandwidth" in sys.argv:
+    # Textual reads its frame rate once, before multipy.hosting imports it
+    from multipy.services.bandwidth import cap_frame_rate
+    cap_frame_rate()
+
+from multipy.hosting import main
+
+if __name__ == "__main__":
+    main()
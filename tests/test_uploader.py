@@ -0,0 +1,175 @@
+"""ResultUploader against a stand-in results server on localhost.
+
+Run from the project root:
+    python -m unittest discover tests
+"""
+import json
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from multipy.models import GameMode, SessionResults, Settings
+from multipy.services.uploader import SPOOL_SUFFIX, ResultUploader
+
+# Seconds to wait for the uploader before failing a test
+WAIT = 10.0
+
+class ResultsServer(ThreadingHTTPServer):
+    """Stores sessions by id, answering the statuses queued in `statuses` first."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ResultsHandler)
+        self.lock = threading.Lock()
+        self.session_ids = []
+        self.statuses = []
+        self.tokens = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/results"
+
+    @property
+    def requests(self) -> int:
+        with self.lock:
+            return len(self.tokens)
+
+class ResultsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with server.lock:
+            server.tokens.append(self.headers.get("Authorization"))
+            status = server.statuses.pop(0) if server.statuses else 200
+            if status == 200:
+                server.session_ids.extend(session["id"] for session in json.loads(body)["sessions"])
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+def sample_session():
+    results = SessionResults(total_questions=2, correct_answers=1, mistakes=1, elapsed_time=4.5, best_streak=1)
+    results.answers.record(3, 4, 12, True, 1_200_000_000)
+    results.answers.record(6, 7, 41, False, 2_500_000_000)
+    return Settings(table_range=10, max_questions=2, game_mode=GameMode.NORMAL), results
+
+def wait_for(condition, timeout: float = WAIT) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+class ResultUploaderTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ResultsServer()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spool_dir = Path(tmp.name) / "uploads"
+
+    def uploader(self, **kwargs) -> ResultUploader:
+        kwargs.setdefault("backoff_base", 0.01)
+        kwargs.setdefault("backoff_max", 0.05)
+        uploader = ResultUploader(self.server.url, spool_dir=self.spool_dir, **kwargs)
+        self.addCleanup(uploader.close)
+        return uploader
+
+    def spooled(self):
+        return sorted(self.spool_dir.glob(f"*{SPOOL_SUFFIX}"))
+
+    def test_retries_until_the_server_recovers(self):
+        self.server.statuses = [503, 503, 429]
+        uploader = self.uploader()
+        for _ in range(3):
+            uploader.enqueue(*sample_session())
+
+        self.assertTrue(uploader.wait_idle(WAIT))
+        self.assertEqual(len(self.server.session_ids), 3)
+        self.assertEqual(len(set(self.server.session_ids)), 3)
+        self.assertGreaterEqual(self.server.requests, 4)
+        self.assertEqual(uploader.sent, 3)
+        self.assertEqual(uploader.pending(), 0)
+        self.assertEqual(self.spooled(), [])
+
+    def test_auth_failure_pauses_until_the_token_changes(self):
+        self.server.statuses = [401]
+        uploader = self.uploader(token="old")
+        uploader.enqueue(*sample_session())
+        uploader.enqueue(*sample_session())
+
+        self.assertTrue(wait_for(lambda: uploader._refused))
+        time.sleep(0.2)
+        # Paused: nothing else was sent and the sessions stay spooled
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(uploader.pending(), 2)
+        self.assertEqual(len(self.spooled()), 2)
+        self.assertFalse(uploader.wait_idle(0))
+
+        uploader.set_token("new")
+        self.assertTrue(uploader.wait_idle(WAIT))
+        self.assertEqual(len(self.server.session_ids), 2)
+        self.assertEqual(self.server.tokens, ["Bearer old", "Bearer new"])
+        self.assertEqual(self.spooled(), [])
+
+    def test_rejected_batch_is_moved_aside(self):
+        self.server.statuses = [400]
+        uploader = self.uploader(batch_size=1)
+        uploader.enqueue(*sample_session())
+        uploader.enqueue(*sample_session())
+
+        self.assertTrue(uploader.wait_idle(WAIT))
+        self.assertEqual(uploader.rejected, 1)
+        self.assertEqual(uploader.sent, 1)
+        self.assertEqual(len(self.server.session_ids), 1)
+        self.assertEqual(len(list((self.spool_dir / "rejected").glob(f"*{SPOOL_SUFFIX}"))), 1)
+        self.assertEqual(self.spooled(), [])
+
+    def test_spool_errors_do_not_stop_the_uploader(self):
+        # A file where the rejected folder should be makes moving fail
+        self.spool_dir.mkdir(parents=True)
+        (self.spool_dir / "rejected").write_text("not a folder")
+        self.server.statuses = [400]
+        uploader = self.uploader(batch_size=1)
+        uploader.enqueue(*sample_session())
+        uploader.enqueue(*sample_session())
+
+        self.assertTrue(uploader.wait_idle(WAIT))
+        self.assertEqual(uploader.rejected, 1)
+        self.assertEqual(uploader.sent, 1)
+        self.assertIn("spool", uploader.last_error)
+        # The rejected session could not be moved and is still spooled
+        self.assertEqual(len(self.spooled()), 1)
+
+        uploader.enqueue(*sample_session())
+        self.assertTrue(wait_for(lambda: uploader.sent == 2))
+
+    def test_close_keeps_unsent_sessions_for_the_next_start(self):
+        self.server.statuses = [503] * 1000
+        uploader = self.uploader(backoff_base=10.0, backoff_max=10.0)
+        uploader.enqueue(*sample_session())
+        uploader.enqueue(*sample_session())
+        uploader.close()
+        self.assertEqual(len(self.spooled()), 2)
+
+        self.server.statuses = []
+        uploader = self.uploader()
+        uploader.start()
+        self.assertTrue(uploader.wait_idle(WAIT))
+        self.assertEqual(len(set(self.server.session_ids)), 2)
+        self.assertEqual(self.spooled(), [])
+
+if __name__ == "__main__":
+    unittest.main()